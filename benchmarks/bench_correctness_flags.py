@@ -0,0 +1,100 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from utils.utils import make_author_df, make_review_df
+
+
+def legacy_make_review_df(review_dict, tasks, convert_to_date=True):
+    review_df = pd.DataFrame(review_dict)
+    review_df["SubmittedDate"] = pd.to_datetime(review_df["SubmittedDate"])
+    if convert_to_date:
+        review_df["SubmittedDate"] = review_df["SubmittedDate"].dt.date
+
+    review_df["Has_0_or_1_Correctness"] = review_df["TaskID"].apply(
+        lambda x: int(x in set(tasks))
+    )
+    return review_df
+
+
+def legacy_make_author_df(author_dict, tasks, convert_to_date=True):
+    author_df = pd.DataFrame(author_dict)
+    author_df["VersionCreatedDate"] = pd.to_datetime(author_df["VersionCreatedDate"])
+    author_df["VersionUpdatedDate"] = pd.to_datetime(author_df["VersionUpdatedDate"])
+
+    if convert_to_date:
+        author_df["VersionCreatedDate"] = author_df["VersionCreatedDate"].dt.date
+        author_df["VersionUpdatedDate"] = author_df["VersionUpdatedDate"].dt.date
+
+    author_df["Has_0_or_1_Correctness"] = author_df.apply(
+        lambda x: int(x["TaskID"] in set(tasks)) if x["VersionNumber"] == 0 else np.nan,
+        axis=1,
+    )
+
+    author_df["Rework_or_NewTask"] = author_df["VersionNumber"].apply(
+        lambda x: "Rework" if x > 0 else "New_Task"
+    )
+    return author_df
+
+
+def make_rows(num_rows: int, num_tasks: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    task_ids = rng.integers(0, 2 * num_tasks, num_rows)
+    dates = (
+        pd.Timestamp("2025-05-01", tz="UTC")
+        + pd.to_timedelta(rng.integers(0, 60 * 24 * 30, num_rows), unit="min")
+    ).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    author_dict = {
+        "TaskID": task_ids,
+        "ConversationVersionID": np.arange(num_rows),
+        "VersionCreatedDate": dates,
+        "VersionUpdatedDate": dates,
+        "durationMinutes": rng.integers(1, 120, num_rows),
+        "VersionNumber": rng.integers(0, 3, num_rows),
+    }
+    review_dict = {
+        "TaskID": task_ids,
+        "ReviewID": np.arange(num_rows),
+        "SubmittedDate": dates,
+        "durationMinutes": rng.integers(1, 60, num_rows),
+    }
+    tasks = pd.Series(rng.choice(2 * num_tasks, num_tasks, replace=False))
+    return author_dict, review_dict, tasks
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    # the legacy path is O(rows x tasks), so it is timed on a sample of rows
+    # and extrapolated linearly
+    parser.add_argument("--legacy-rows", type=int, default=2_000)
+    args = parser.parse_args()
+
+    author_dict, review_dict, tasks = make_rows(args.rows, args.tasks)
+    legacy_rows = min(args.legacy_rows, args.rows)
+
+    for name, legacy_func, func, rows in [
+        ("make_review_df", legacy_make_review_df, make_review_df, review_dict),
+        ("make_author_df", legacy_make_author_df, make_author_df, author_dict),
+    ]:
+        sample = {k: v[:legacy_rows] for k, v in rows.items()}
+        legacy_seconds, legacy_df = timed(legacy_func, sample, tasks)
+        legacy_seconds *= args.rows / legacy_rows
+        current_df = func(sample, tasks)
+        # the legacy path predates the categorical columns, values must still match
+        categorical = current_df.select_dtypes("category").columns
+        current_df[categorical] = current_df[categorical].astype(object)
+        pd.testing.assert_frame_equal(legacy_df, current_df)
+        seconds, _ = timed(func, rows, tasks)
+        print(
+            f"{name}: {args.rows} rows, {args.tasks} tasks, "
+            f"legacy {legacy_seconds:.3f}s (from {legacy_rows} rows), "
+            f"current {seconds:.3f}s, speedup {legacy_seconds / seconds:.1f}x"
+        )
@@ -0,0 +1,81 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from utils.utils import make_reviewer_agg
+
+
+def legacy_make_reviewer_agg(input_df) -> pd.DataFrame:
+    first_df = (
+        input_df.groupby(["Reviewer", "SubmittedDate", "Reviewed"])["TaskID"]
+        .size()
+        .reset_index()
+    )
+    first_df = (
+        first_df.pivot(
+            columns="Reviewed", index=["Reviewer", "SubmittedDate"], values="TaskID"
+        )
+        .reset_index()
+        .rename(columns={"No": "Num_Reworks", "Yes": "Num_Done"})
+    )
+
+    second_df = (
+        input_df.groupby(["Reviewer", "SubmittedDate", "Reviewed"])["durationMinutes"]
+        .mean()
+        .reset_index()
+    )
+    second_df = (
+        second_df.pivot(
+            columns="Reviewed",
+            index=["Reviewer", "SubmittedDate"],
+            values="durationMinutes",
+        )
+        .reset_index()
+        .rename(columns={"No": "Rework_duration_min", "Yes": "Done_duration_min"})
+    )
+
+    return first_df.merge(
+        second_df, on=["Reviewer", "SubmittedDate"], validate="one_to_one"
+    )
+
+
+def make_reviews(num_rows: int, num_reviewers: int, num_days: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-05-01", periods=num_days).date
+    reviewers = np.array([f"reviewer{i}@turing.com" for i in range(num_reviewers)])
+    return pd.DataFrame(
+        {
+            "TaskID": rng.integers(0, num_rows // 4, num_rows),
+            "Reviewer": reviewers[rng.integers(0, num_reviewers, num_rows)],
+            "SubmittedDate": dates[rng.integers(0, num_days, num_rows)],
+            "durationMinutes": rng.integers(1, 120, num_rows),
+            "Reviewed": np.where(rng.random(num_rows) < 0.3, "No", "Yes"),
+        }
+    )
+
+
+def timed(func, *args, repeat: int = 3):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds.append(time.perf_counter() - start)
+    return min(seconds), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--reviewers", type=int, default=300)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    review_df = make_reviews(args.rows, args.reviewers, args.days)
+    legacy_seconds, legacy_df = timed(legacy_make_reviewer_agg, review_df)
+    seconds, current_df = timed(make_reviewer_agg, review_df)
+    pd.testing.assert_frame_equal(legacy_df, current_df, check_names=False)
+    print(
+        f"make_reviewer_agg: {args.rows} rows, {len(current_df)} groups, "
+        f"legacy {legacy_seconds:.3f}s, current {seconds:.3f}s, "
+        f"speedup {legacy_seconds / seconds:.1f}x"
+    )
@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import glob
+import asyncio
+import argparse
+import importlib
+import tempfile
+from utils.utils import run_projects
+from benchmarks.suite import MAIN_PROJECT_IDS, start_standin, script_args
+
+SCRIPTS = ("labeling_tool", "labeling_tool_3")
+
+
+def read_posts(post_dir: str):
+    posts = []
+    for path in sorted(glob.glob(os.path.join(post_dir, "post_*.json"))):
+        with open(path) as file:
+            posts.append(json.load(file))
+        os.remove(path)
+    return posts
+
+
+def check_script(script: str, base_url: str, post_dir: str, cache_dir: str):
+    module = importlib.import_module(script)
+    project_id = MAIN_PROJECT_IDS[script]
+    args = script_args(script, base_url, "--incremental", "--cache-dir", cache_dir)
+    runs = []
+    # the first run is a full sync, the second asks for updatedAt >= its mark
+    for _ in range(2):
+        asyncio.run(run_projects([project_id], module.fetch, module.build_report, args))
+        runs.append(read_posts(post_dir))
+    failed = any(post.get("status") == "fail" for posts in runs for post in posts)
+    return (not failed) and bool(runs[0]) and (runs[0] == runs[1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay two incremental runs back to back against the stand-in"
+    )
+    parser.add_argument("--tasks", type=int, default=200, help="conversations per tab")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        post_dir = os.path.join(directory, "posts")
+        server, base_url = start_standin(args.tasks, args.seed, "--post-dir", post_dir)
+        try:
+            for script in SCRIPTS:
+                passed = check_script(
+                    script, base_url, post_dir, os.path.join(directory, script)
+                )
+                print(f"{script:<20} {'ok' if passed else 'FAILED'}", flush=True)
+                ok = ok and passed
+        finally:
+            server.terminate()
+            server.wait()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,73 @@
+import sys
+import json
+import argparse
+
+METRICS = ("seconds", "peak_bytes")
+
+
+def index_results(suite: dict):
+    return {(row["benchmark"], row["size"]): row for row in suite["results"]}
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 1.2):
+    baseline_rows = index_results(baseline)
+    rows = []
+    for key, row in index_results(current).items():
+        if key not in baseline_rows:
+            continue
+        old = baseline_rows[key]
+        compared = {"benchmark": key[0], "size": key[1], "regressed": False}
+        for metric in METRICS:
+            if (metric in old) and (metric in row) and old[metric]:
+                ratio = row[metric] / old[metric]
+                compared[metric] = (old[metric], row[metric], ratio)
+                compared["regressed"] |= ratio > threshold
+        # a stage that used to pass and now fails is the worst regression
+        if ("error" in row) and ("error" not in old):
+            compared["error"] = row["error"]
+            compared["regressed"] = True
+        rows.append(compared)
+    return rows
+
+
+def format_metric(values, scale: float, unit: str):
+    if values is None:
+        return f"{'':>28}"
+    old, new, ratio = values
+    return f"{old / scale:9.3f} -> {new / scale:9.3f}{unit} {ratio:5.2f}x"
+
+
+def print_comparison(rows):
+    for row in rows:
+        line = (
+            f"{row['benchmark']:<34} {row['size']:>8}  "
+            f"{format_metric(row.get('seconds'), 1, 's')}  "
+            f"{format_metric(row.get('peak_bytes'), 2**20, 'M')}"
+        )
+        if "error" in row:
+            line += f"  now failing: {row['error']}"
+        if row["regressed"]:
+            line += "  REGRESSED"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff two benchmark suite results")
+    parser.add_argument("baseline", type=str)
+    parser.add_argument("current", type=str)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="flag time or peak memory ratios above this",
+    )
+    args = parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    rows = compare_results(baseline, current, args.threshold)
+    print_comparison(rows)
+    if any(row["regressed"] for row in rows):
+        sys.exit(1)
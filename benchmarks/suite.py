@@ -0,0 +1,313 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import importlib
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from utils.synthetic import ConversationGenerator
+from utils.utils import (
+    add_client_args,
+    get_tabs_urls,
+    run_projects,
+    parse_responses,
+    prepare_task_df,
+    make_author_df,
+    make_review_df,
+    fix_discardability,
+    ReportContext,
+    make_author_share_df,
+    make_author_metrics_share_df,
+    make_reviewer_share_df,
+    make_second_reviewer_share,
+    make_reviewer_agg,
+    make_overall_stats,
+    make_share_json,
+)
+from benchmarks.compare import compare_results, print_comparison
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+STAGE_PROJECT_ID = "472"
+# one project per script, from the project family it reports on; pending_status
+# is left out, its rework merge brings Author in from both frames (Author_x and
+# Author_y) and every run stops at the groupby("Author") with a KeyError
+MAIN_PROJECT_IDS = {
+    "labeling_tool": "472",
+    "labeling_tool_2": "448",
+    "labeling_tool_3": "547",
+    "pending_status_v2": "547",
+}
+
+
+class GeneratedResponse:
+    def __init__(self, conversations: list):
+        self.conversations = conversations
+
+    def json(self):
+        return self.conversations
+
+
+def make_dataset(project_id: str, num_tasks: int, seed: int):
+    generator = ConversationGenerator(project_id, seed=seed)
+    tabs, _ = get_tabs_urls(project_id)
+    responses = [
+        GeneratedResponse(list(generator.conversations(tab, num_tasks))) for tab in tabs
+    ]
+    return tabs, responses
+
+
+def prepare_frames(parsed, project_id: str):
+    task_dict, author_dict, review_dict = parsed
+    task_df = prepare_task_df(task_dict, project_id)
+    review_df = make_review_df(review_dict, task_df["TaskID"])
+    author_df = make_author_df(author_dict, task_df["TaskID"])
+    review_df = fix_discardability(review_df)
+    author_df = author_df[author_df.columns[author_df.notnull().sum() != 0]]
+    review_df = review_df[review_df.columns[review_df.notnull().sum() != 0]]
+    return task_df, author_df, review_df
+
+
+def stage_benchmarks(tabs, responses, project_id: str):
+    # (name, setup, func): setup runs before every repeat and is not timed, so a
+    # builder that mutates its input or fills a ReportContext always starts cold
+    parsed = parse_responses(responses, tabs, project_id, ())
+    task_dict, author_dict, review_dict = parsed
+    task_df, author_df, review_df = prepare_frames(parsed, project_id)
+    raw_review_df = make_review_df(review_dict, task_df["TaskID"])
+    author_share_df = make_author_share_df(ReportContext(author_df, review_df))
+
+    def context():
+        return (ReportContext(author_df, review_df),)
+
+    return [
+        (
+            "parse_responses",
+            lambda: (responses, tabs, project_id, ()),
+            parse_responses,
+        ),
+        ("prepare_task_df", lambda: (task_dict, project_id), prepare_task_df),
+        ("make_review_df", lambda: (review_dict, task_df["TaskID"]), make_review_df),
+        ("make_author_df", lambda: (author_dict, task_df["TaskID"]), make_author_df),
+        ("fix_discardability", lambda: (raw_review_df,), fix_discardability),
+        ("make_author_share_df", context, make_author_share_df),
+        ("make_author_metrics_share_df", context, make_author_metrics_share_df),
+        ("make_reviewer_share_df", lambda: (review_df,), make_reviewer_share_df),
+        (
+            "make_second_reviewer_share",
+            lambda: (review_df,),
+            make_second_reviewer_share,
+        ),
+        ("make_reviewer_agg", lambda: (review_df,), make_reviewer_agg),
+        ("make_overall_stats", context, make_overall_stats),
+        ("make_share_json", lambda: (author_share_df,), make_share_json),
+    ], {
+        "tasks": len(task_df),
+        "author_rows": len(author_df),
+        "review_rows": len(review_df),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_standin(num_tasks: int, seed: int, *extra_args):
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "standin_server.py",
+            "--synthetic",
+            str(num_tasks),
+            "--seed",
+            str(seed),
+            "--port",
+            str(port),
+            *extra_args,
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def script_args(script: str, base_url: str, *extra_args):
+    appscript_url = f"{base_url}/post"
+    if script in ("labeling_tool", "labeling_tool_2"):
+        appscript_url = f"KEY@@{appscript_url}"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("bearer_token", type=str)
+    parser.add_argument("appscript_url", type=str)
+    add_client_args(parser)
+    return parser.parse_args(
+        ["TOKEN", appscript_url, "--base-url", base_url, "--no-manifest", *extra_args]
+    )
+
+
+def main_benchmarks(base_url: str):
+    benchmarks = []
+    for script, project_id in MAIN_PROJECT_IDS.items():
+        module = importlib.import_module(script)
+        args = script_args(script, base_url)
+
+        def run_main(module=module, project_id=project_id, args=args):
+            asyncio.run(
+                run_projects([project_id], module.fetch, module.build_report, args)
+            )
+
+        benchmarks.append((f"main:{script}", lambda: (), run_main))
+    return benchmarks
+
+
+def measure(setup, func, repeat: int, memory: bool, warmup: int):
+    for _ in range(warmup):
+        func(*setup())
+    seconds = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        func(*args)
+        seconds.append(time.perf_counter() - start)
+    result = {"seconds": min(seconds), "mean_seconds": float(np.mean(seconds))}
+    if memory:
+        # a separate run, tracing allocations slows the timed ones down
+        args = setup()
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_bytes"] = peak
+    return result
+
+
+def run_benchmark(name, setup, func, size: int, args, warmup: int = 0):
+    try:
+        result = measure(setup, func, args.repeat, not args.no_memory, warmup)
+    except Exception as error:
+        result = {"error": f"{type(error).__name__}: {error}"}
+    line = f"{name:<34} {size:>8}"
+    if "error" in result:
+        line += f"  failed: {result['error']}"
+    else:
+        line += f"  {result['seconds']:9.4f}s"
+        if "peak_bytes" in result:
+            line += f"  {result['peak_bytes'] / 2**20:9.1f} MiB"
+    print(line, flush=True)
+    return {"benchmark": name, "size": size, **result}
+
+
+def selected(name: str, args):
+    return (not args.only) or any(pattern in name for pattern in args.only)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    results, datasets = [], {}
+    for size in args.sizes:
+        tabs, responses = make_dataset(STAGE_PROJECT_ID, size, args.seed)
+        benchmarks, counts = stage_benchmarks(tabs, responses, STAGE_PROJECT_ID)
+        datasets[str(size)] = counts
+        for name, setup, func in benchmarks:
+            if selected(name, args):
+                results.append(run_benchmark(name, setup, func, size, args))
+        del tabs, responses, benchmarks
+
+        if args.skip_main:
+            continue
+        server, base_url = start_standin(size, args.seed)
+        try:
+            for name, setup, func in main_benchmarks(base_url):
+                if selected(name, args):
+                    # the first run pays for the server generating its tabs
+                    results.append(
+                        run_benchmark(name, setup, func, size, args, warmup=1)
+                    )
+        finally:
+            server.terminate()
+            server.wait()
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "datasets": datasets,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time and memory-profile every reporting stage on generated data"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[200, 2000, 10000],
+        help="conversations per tab",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--only", type=str, nargs="+", default=None, help="benchmark name substrings"
+    )
+    parser.add_argument(
+        "--skip-main", action="store_true", help="only the in-process stages"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the tracemalloc run"
+    )
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument(
+        "--compare", type=str, default=None, help="earlier results file to diff against"
+    )
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    suite = run_suite(args)
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"{datetime.now():%Y%m%d-%H%M%S}-{suite['commit'] or 'nogit'}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(suite, file, indent=2)
+    print(f"Saved {output}")
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        rows = compare_results(baseline, suite, args.threshold)
+        print_comparison(rows)
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
@@ -0,0 +1,50 @@
+import time
+import argparse
+from utils.synthetic import SYNTHETIC_TABS, write_fixtures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write synthetic tab responses as <project_id>/<tab>.json.gz"
+    )
+    parser.add_argument("output", type=str, help="fixture directory to write")
+    parser.add_argument(
+        "--projects", type=str, nargs="+", default=["472", "547", "441", "449", "448"]
+    )
+    parser.add_argument("--tabs", type=str, nargs="+", default=SYNTHETIC_TABS)
+    parser.add_argument(
+        "--tasks", type=int, default=1000, help="conversations per project and tab"
+    )
+    parser.add_argument("--versions-per-task", type=int, default=3)
+    parser.add_argument(
+        "--review-rounds",
+        type=int,
+        default=2,
+        help="most reviews on an accepted version",
+    )
+    parser.add_argument("--authors", type=int, default=25)
+    parser.add_argument("--reviewers", type=int, default=10)
+    parser.add_argument("--batches", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="tabs to write in parallel processes"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = write_fixtures(
+        args.output,
+        args.projects,
+        args.tasks,
+        tabs=args.tabs,
+        jobs=args.jobs,
+        num_authors=args.authors,
+        num_reviewers=args.reviewers,
+        versions_per_task=args.versions_per_task,
+        review_rounds=args.review_rounds,
+        num_batches=args.batches,
+        seed=args.seed,
+    )
+    print(
+        f"Wrote {len(paths)} tabs of {args.tasks} conversations "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
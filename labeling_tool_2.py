@@ -1,5 +1,4 @@
 from urllib.parse import quote
-import requests
 import pandas as pd
 import asyncio
 from cryptography.fernet import Fernet
@@ -7,12 +6,15 @@ from io import StringIO
 import argparse
 from utils.constants import PROJECT_IDS_2
 from utils.utils import (
-    get_tabs_urls,
-    get_responses,
+    post_report,
+    LabelingClient,
+    add_client_args,
+    run_projects,
+    fetch_project,
     make_share_json,
-    parse_responses,
     prepare_task_df,
     make_author_df,
+    ReportContext,
     make_author_share_df,
     make_review_df,
     make_reviewer_share_df,
@@ -22,25 +24,27 @@ from utils.utils import (
     fix_discardability,
 )
 
+# statement fields this report reads, on top of the ones every task row needs
+METADATA_KEYS = (
+    "rc_form_response_isQuestionCorrect",
+    "rc_form_response_hasImageInQuestionChoices",
+)
+REPORT_PROJECT_IDS = PROJECT_IDS_2
 
-def main(project_id: str, bearer_token: str, appscript_url: str):
-    key, appscript_url = appscript_url.split("@@")
 
-    tabs, urls = get_tabs_urls(project_id)
-    all_responses = asyncio.run(get_responses(urls, bearer_token=bearer_token))
+async def fetch(project_id: str, client: LabelingClient):
+    return await fetch_project(project_id, client, METADATA_KEYS)
 
-    try:
-        for i in all_responses:
-            assert i.status_code == 200, "Wrong Status Code"
-    except:
-        requests.post(appscript_url, json={"projectID": project_id, "status": "fail"})
-        return
 
-    task_dict, author_dict, review_dict = parse_responses(
-        all_responses, tabs, project_id
-    )
+def build_report(project_id: str, parsed, appscript_url: str):
+    key, appscript_url = appscript_url.split("@@")
 
-    task_df = prepare_task_df(task_dict)
+    if parsed is None:
+        post_report(appscript_url, {"projectID": project_id, "status": "fail"})
+        return
+    task_dict, author_dict, review_dict = parsed
+
+    task_df = prepare_task_df(task_dict, project_id)
     # task_df.to_csv(f"{project_id}_task.csv", index=False)
 
     review_df = make_review_df(review_dict, task_df["TaskID"])
@@ -78,13 +82,15 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
     author_df = author_df[author_df.columns[author_df.notnull().sum() != 0]]
     review_df = review_df[review_df.columns[review_df.notnull().sum() != 0]]
 
-    author_summary_share = make_author_share_df(author_df, review_df)
+    context = ReportContext(author_df, review_df)
+
+    author_summary_share = make_author_share_df(context)
 
     reviewer_summary_share = make_reviewer_share_df(review_df)
 
-    overall_stats_share = make_overall_stats(author_df, review_df)
+    overall_stats_share = make_overall_stats(context)
 
-    author_metrics_share = make_author_metrics_share_df(author_df, review_df)
+    author_metrics_share = make_author_metrics_share_df(context)
 
     second_reviewer_summary_share = make_second_reviewer_share(review_df)
 
@@ -106,9 +112,9 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
     )
     sub_task_df = task_df[task_df["Status"].str.contains("Done")]
 
-    requests.post(
+    post_report(
         appscript_url,
-        json={
+        {
             "projectID": project_id,
             "status": "pass",
             "Author_summary": make_share_json(
@@ -146,11 +152,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("bearer_token", type=str)
     parser.add_argument("appscript_url", type=str)
+    add_client_args(parser)
     args = parser.parse_args()
 
-    for project_id in PROJECT_IDS_2:
-        main(
-            project_id=project_id,
-            bearer_token=args.bearer_token,
-            appscript_url=args.appscript_url,
-        )
+    asyncio.run(run_projects(REPORT_PROJECT_IDS, fetch, build_report, args))
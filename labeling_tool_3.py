@@ -1,48 +1,45 @@
 from urllib.parse import quote
-import requests
 from datetime import datetime
 import pandas as pd
 import asyncio
 
 import argparse
-from utils.constants import PROJECT_IDS_4
+from utils.constants import PROJECT_IDS_4, PENDING_REVIEW_RULES
 from utils.utils import (
-    get_tabs_urls,
-    get_responses,
+    post_report,
+    LabelingClient,
+    add_client_args,
+    run_projects,
+    evaluate_rules,
+    fetch_project,
     make_share_json,
-    parse_responses,
     prepare_task_df,
     make_author_df,
     make_review_df,
     make_reviewer_agg,
+    observed_counts,
 )
 
+# statement fields this report reads, on top of the ones every task row needs
+METADATA_KEYS = ()
+REPORT_PROJECT_IDS = PROJECT_IDS_4
 
-def map_pending_review(series: pd.Series):
-    if series["tab"] == "pending_review":
-        if series["HasReviewer"]:
-            return "pending_review_with_reviewer"
-        else:
-            return "pending_review_without_reviewer"
-    return series["tab"]
 
+def map_pending_review(df: pd.DataFrame):
+    return evaluate_rules(df, PENDING_REVIEW_RULES, default=df["tab"])
 
-def main(project_id: str, bearer_token: str, appscript_url: str):
-    tabs, urls = get_tabs_urls(project_id)
-    all_responses = asyncio.run(get_responses(urls, bearer_token=bearer_token))
 
-    try:
-        for i in all_responses:
-            assert i.status_code == 200, "Wrong Status Code"
-    except:
-        requests.post(appscript_url, json={"projectID": project_id, "status": "fail"})
-        return
+async def fetch(project_id: str, client: LabelingClient):
+    return await fetch_project(project_id, client, METADATA_KEYS)
 
-    task_dict, author_dict, review_dict = parse_responses(
-        all_responses, tabs, project_id
-    )
 
-    task_df = prepare_task_df(task_dict)
+def build_report(project_id: str, parsed, appscript_url: str):
+    if parsed is None:
+        post_report(appscript_url, {"projectID": project_id, "status": "fail"})
+        return
+    task_dict, author_dict, review_dict = parsed
+
+    task_df = prepare_task_df(task_dict, project_id)
     task_df["formStage"] = task_df["formStage"].str.strip()
     # task_df.to_csv(f"{project_id}_task.csv", index=False)
 
@@ -65,7 +62,7 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
         author_df["form_stage"].str.split("-").apply(lambda x: x[0].strip())
     )
     author_df["combined_status"] = (
-        author_df["form_stage_short"] + "-" + author_df["Rework_or_NewTask"]
+        author_df["form_stage_short"] + "-" + author_df["Rework_or_NewTask"].astype(str)
     )
     author_df["combined_status"] = author_df["combined_status"].replace(
         {"stage2-Rework": "stage2"}
@@ -76,6 +73,7 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
         values="TaskID",
         aggfunc="count",
         columns="combined_status",
+        observed=True,
     )
     df_mean = pd.pivot_table(
         author_df,
@@ -83,6 +81,7 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
         values="durationMinutes",
         aggfunc="mean",
         columns="combined_status",
+        observed=True,
     )
     df_author_final = df_counts.join(
         df_mean,
@@ -136,7 +135,7 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
             ],
             on="TaskID",
         )
-        .groupby("Subject")
+        .groupby("Subject", observed=True)
         .agg(
             {
                 "TaskID": "nunique",
@@ -153,7 +152,7 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
         )
         .reset_index()
         .merge(
-            reviewed_task.groupby("Subject")[["review_duration"]]
+            reviewed_task.groupby("Subject", observed=True)[["review_duration"]]
             .sum()
             .reset_index()
             .rename(columns={"review_duration": "Reviewer time on tasks"}),
@@ -161,40 +160,35 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
             how="outer",
         )
         .merge(
-            completed_task["Subject"]
-            .value_counts()
+            observed_counts(completed_task["Subject"])
             .reset_index()
             .rename(columns={"count": "Num Tasks Completed by Author"}),
             on="Subject",
             how="outer",
         )
         .merge(
-            task_df["Subject"]
-            .value_counts()
+            observed_counts(task_df["Subject"])
             .reset_index()
             .rename(columns={"count": "Num Total Tasks"}),
             on="Subject",
             how="outer",
         )
         .merge(
-            inprogress_task["Subject"]
-            .value_counts()
+            observed_counts(inprogress_task["Subject"])
             .reset_index()
             .rename(columns={"count": "Num Tasks In Progress"}),
             on="Subject",
             how="outer",
         )
         .merge(
-            rework_task["Subject"]
-            .value_counts()
+            observed_counts(rework_task["Subject"])
             .reset_index()
             .rename(columns={"count": "Num Tasks In Rework"}),
             on="Subject",
             how="outer",
         )
         .merge(
-            delivery_task["Subject"]
-            .value_counts()
+            observed_counts(delivery_task["Subject"])
             .reset_index()
             .rename(columns={"count": "Num Tasks Delivered"}),
             on="Subject",
@@ -284,9 +278,9 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
     # date_agg.to_csv("date_agg.csv", index=False)
     # completed_agg.to_csv("completed_agg.csv", index=False)
 
-    requests.post(
+    post_report(
         appscript_url,
-        json={
+        {
             "projectID": project_id,
             "status": "pass",
             "AuthorSummary": make_share_json(df_author_final),
@@ -301,11 +295,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("bearer_token", type=str)
     parser.add_argument("appscript_url", type=str)
+    add_client_args(parser)
     args = parser.parse_args()
 
-    for project_id in PROJECT_IDS_4:
-        main(
-            project_id=project_id,
-            bearer_token=args.bearer_token,
-            appscript_url=args.appscript_url,
-        )
+    asyncio.run(run_projects(REPORT_PROJECT_IDS, fetch, build_report, args))
@@ -1,47 +1,43 @@
 from urllib.parse import quote
-import requests
 from datetime import datetime
 import pandas as pd
 import asyncio
 
 import argparse
-from utils.constants import PROJECT_IDS_3
+from utils.constants import PROJECT_IDS_3, PENDING_REVIEW_RULES
 from utils.utils import (
-    get_tabs_urls,
-    get_responses,
+    post_report,
+    LabelingClient,
+    add_client_args,
+    run_projects,
+    evaluate_rules,
+    fetch_project,
     make_share_json,
-    parse_responses,
     prepare_task_df,
     make_author_df,
     make_review_df,
 )
 
+# statement fields this report reads, on top of the ones every task row needs
+METADATA_KEYS = ("batchName",)
+REPORT_PROJECT_IDS = PROJECT_IDS_3
 
-def map_pending_review(series: pd.Series):
-    if series["tab"] == "pending_review":
-        if series["HasReviewer"]:
-            return "pending_review_with_reviewer"
-        else:
-            return "pending_review_without_reviewer"
-    return series["tab"]
 
+def map_pending_review(df: pd.DataFrame):
+    return evaluate_rules(df, PENDING_REVIEW_RULES, default=df["tab"])
 
-def main(project_id: str, bearer_token: str, appscript_url: str):
-    tabs, urls = get_tabs_urls(project_id)
-    all_responses = asyncio.run(get_responses(urls, bearer_token=bearer_token))
 
-    try:
-        for i in all_responses:
-            assert i.status_code == 200, "Wrong Status Code"
-    except:
-        requests.post(appscript_url, json={"projectID": project_id, "status": "fail"})
-        return
+async def fetch(project_id: str, client: LabelingClient):
+    return await fetch_project(project_id, client, METADATA_KEYS)
 
-    task_dict, author_dict, review_dict = parse_responses(
-        all_responses, tabs, project_id
-    )
 
-    task_df = prepare_task_df(task_dict)
+def build_report(project_id: str, parsed, appscript_url: str):
+    if parsed is None:
+        post_report(appscript_url, {"projectID": project_id, "status": "fail"})
+        return
+    task_dict, author_dict, review_dict = parsed
+
+    task_df = prepare_task_df(task_dict, project_id)
     # task_df.to_csv(f"{project_id}_task.csv", index=False)
 
     review_df = make_review_df(review_dict, task_df["TaskID"], convert_to_date=False)
@@ -88,7 +84,7 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
         task_df["tab"].isin(["rework", "pending_review", "unclaimed", "inprogress"])
     ].sort_values("batchId")
     sub_df["HasReviewer"] = sub_df["TaskID"].isin(review_df["TaskID"].unique())
-    sub_df["tab"] = sub_df.apply(map_pending_review, axis=1)
+    sub_df["tab"] = map_pending_review(sub_df)
 
     incomplete_batches = sub_df["batchName"].unique()
     complete_batches = task_df[~task_df["batchName"].isin(incomplete_batches)][
@@ -109,9 +105,9 @@ def main(project_id: str, bearer_token: str, appscript_url: str):
         .apply(lambda x: f"{int(x//3600)}:{int((x//60)%60)}:{int(x%60)}")
     )
 
-    requests.post(
+    post_report(
         appscript_url,
-        json={
+        {
             "projectID": project_id,
             "status": "pass",
             "Reworks": make_share_json(
@@ -154,11 +150,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("bearer_token", type=str)
     parser.add_argument("appscript_url", type=str)
+    add_client_args(parser)
     args = parser.parse_args()
 
-    for project_id in PROJECT_IDS_3:
-        main(
-            project_id=project_id,
-            bearer_token=args.bearer_token,
-            appscript_url=args.appscript_url,
-        )
+    asyncio.run(run_projects(REPORT_PROJECT_IDS, fetch, build_report, args))
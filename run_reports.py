@@ -0,0 +1,53 @@
+import asyncio
+import argparse
+import importlib
+from functools import partial
+from utils.utils import add_client_args, fetch_project, run_pipeline
+
+REPORTS = (
+    "labeling_tool",
+    "labeling_tool_2",
+    "labeling_tool_3",
+    "pending_status",
+    "pending_status_v2",
+)
+
+
+def merge_metadata_keys(modules):
+    keys = {}
+    for module in modules:
+        if module.METADATA_KEYS is None:
+            return None
+        keys.update(dict.fromkeys(module.METADATA_KEYS))
+    return tuple(keys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("bearer_token", type=str)
+    parser.add_argument(
+        "--report",
+        nargs=2,
+        action="append",
+        required=True,
+        metavar=("NAME", "APPSCRIPT_URL"),
+        help=f"report to build, one of {', '.join(REPORTS)}; may be repeated",
+    )
+    add_client_args(parser)
+    args = parser.parse_args()
+
+    project_reports = {}
+    modules = []
+    for name, appscript_url in args.report:
+        if name not in REPORTS:
+            parser.error(f"unknown report {name}")
+        module = importlib.import_module(name)
+        modules.append(module)
+        for project_id in module.REPORT_PROJECT_IDS:
+            project_reports.setdefault(project_id, []).append(
+                (module.build_report, appscript_url)
+            )
+
+    # every project is fetched and parsed once for all of its reports
+    fetch = partial(fetch_project, metadata_keys=merge_metadata_keys(modules))
+    asyncio.run(run_pipeline(project_reports, fetch, args))
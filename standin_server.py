@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import gzip
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from utils.replay import match_tab_path, split_updated_since, fixture_path
+from utils.synthetic import ConversationGenerator, SYNTHETIC_TABS
+from utils.upload import assemble_envelopes, decode_payload
+
+CHUNK_SIZE = 1 << 16
+
+
+class FixtureStore:
+    def __init__(self, directory: str, payload_scale: float = 1.0):
+        self.directory = directory
+        self.payload_scale = payload_scale
+        self.lock = threading.Lock()
+        self.loaded = {}
+
+    def read(self, project_id: str, tab: str):
+        path = fixture_path(self.directory, project_id, tab)
+        if os.path.exists(path):
+            with gzip.open(path, "rb") as file:
+                return json.loads(file.read())
+        path = os.path.join(self.directory, project_id, f"{tab}.json")
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                return json.loads(file.read())
+        return None
+
+    def conversations(self, project_id: str, tab: str):
+        with self.lock:
+            if (project_id, tab) not in self.loaded:
+                conversations = self.read(project_id, tab)
+                if conversations is not None:
+                    conversations = scale_conversations(
+                        conversations, self.payload_scale
+                    )
+                self.loaded[project_id, tab] = conversations
+            return self.loaded[project_id, tab]
+
+
+class SyntheticStore(FixtureStore):
+    def __init__(self, num_tasks: int, payload_scale: float = 1.0, seed: int = 0):
+        super().__init__(None, payload_scale)
+        self.num_tasks = num_tasks
+        self.seed = seed
+
+    def read(self, project_id: str, tab: str):
+        if tab not in SYNTHETIC_TABS:
+            return None
+        generator = ConversationGenerator(project_id, seed=self.seed)
+        return list(generator.conversations(tab, self.num_tasks))
+
+
+def scale_conversations(conversations: list, payload_scale: float):
+    if (payload_scale == 1) or (not conversations):
+        return conversations
+    id_offset = max(conversation["id"] for conversation in conversations) + 1
+    num_rows = int(len(conversations) * payload_scale)
+    return [
+        {
+            **conversations[i % len(conversations)],
+            "id": conversations[i % len(conversations)]["id"]
+            + id_offset * (i // len(conversations)),
+        }
+        for i in range(num_rows)
+    ]
+
+
+def make_handler(store: FixtureStore, args):
+    post_counter = [0]
+    post_lock = threading.Lock()
+    # chunked uploads are held until every chunk of a run has arrived
+    pending_uploads = {}
+
+    class StandinHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+        def do_GET(self):
+            path, updated_since = split_updated_since(self.path)
+            match = match_tab_path(path)
+            conversations = None if match is None else store.conversations(*match)
+            if conversations is None:
+                self.send_error(404)
+                return
+            if updated_since is not None:
+                conversations = [
+                    conversation
+                    for conversation in conversations
+                    if (conversation.get("updatedAt") or "") >= updated_since
+                ]
+            body = json.dumps(conversations).encode()
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+            time.sleep(args.latency)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            for start in range(0, len(body), CHUNK_SIZE):
+                self.wfile.write(body[start : start + CHUNK_SIZE])
+                if args.bandwidth:
+                    time.sleep(CHUNK_SIZE / args.bandwidth)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if random.random() < args.fail_rate:
+                self.send_error(503)
+                return
+            if args.post_dir is not None:
+                self.save_post(body)
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def save_post(self, body: bytes):
+            payload = json.loads(body)
+            with post_lock:
+                if "upload" in payload:
+                    chunks = pending_uploads.setdefault(payload["upload"]["runId"], {})
+                    chunks[payload["upload"]["chunkIndex"]] = payload
+                    if len(chunks) < payload["upload"]["chunkCount"]:
+                        return
+                    del pending_uploads[payload["upload"]["runId"]]
+                    body = json.dumps(assemble_envelopes(chunks.values())).encode()
+                elif "sheetFormat" in payload:
+                    body = json.dumps(decode_payload(payload)).encode()
+                post_counter[0] += 1
+                path = os.path.join(args.post_dir, f"post_{post_counter[0]:04d}")
+            with open(f"{path}.json", "wb") as file:
+                file.write(body)
+
+    return StandinHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve recorded tab responses with the labeling API URL shape"
+    )
+    parser.add_argument(
+        "fixtures",
+        type=str,
+        nargs="?",
+        default=None,
+        help="directory of <project_id>/<tab>.json[.gz]",
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=None,
+        metavar="TASKS",
+        help="serve generated conversations, TASKS per project and tab",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds before each response"
+    )
+    parser.add_argument(
+        "--bandwidth", type=float, default=None, help="bytes per second per response"
+    )
+    parser.add_argument(
+        "--payload-scale",
+        type=float,
+        default=1.0,
+        help="repeat (or truncate) each tab's conversations by this factor",
+    )
+    parser.add_argument(
+        "--post-dir", type=str, default=None, help="save posted reports here"
+    )
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.0,
+        help="fraction of posts answered with a 503, to exercise upload retries",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if (args.fixtures is None) == (args.synthetic is None):
+        parser.error("pass either a fixtures directory or --synthetic")
+
+    if args.post_dir is not None:
+        os.makedirs(args.post_dir, exist_ok=True)
+    if args.synthetic is not None:
+        store = SyntheticStore(args.synthetic, args.payload_scale, args.seed)
+        source = f"{args.synthetic} synthetic conversations per tab"
+    else:
+        store = FixtureStore(args.fixtures, args.payload_scale)
+        source = args.fixtures
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store, args))
+    print(f"Serving {source} on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,126 @@
+from array import array
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+from .constants import QUALITY_DIM_ID_MAPPING
+
+
+# Rows are stored as value tuples in chunks keyed by their column names, so
+# appending a row is a couple of C-level calls no matter how many columns
+# exist. Columns missing from a chunk are implicit nulls that only become
+# NaN when the frame is built.
+class ColumnarRows:
+    def __init__(self):
+        self.num_rows = 0
+        self.chunks = {}
+
+    def __len__(self):
+        return self.num_rows
+
+    def append_values(self, names: tuple, values: tuple):
+        chunk = self.chunks.get(names)
+        if chunk is None:
+            chunk = self.chunks[names] = ([], [])
+        chunk[0].append(self.num_rows)
+        chunk[1].append(values)
+        self.num_rows += 1
+
+    def append(self, row: dict):
+        self.append_values(tuple(row), tuple(row.values()))
+
+    def extend(self, other: "ColumnarRows"):
+        for names, (other_positions, other_rows) in other.chunks.items():
+            if names not in self.chunks:
+                self.chunks[names] = ([], [])
+            positions, rows = self.chunks[names]
+            positions.extend(position + self.num_rows for position in other_positions)
+            rows.extend(other_rows)
+        self.num_rows += other.num_rows
+
+    @classmethod
+    def concat(cls, parts):
+        output = cls()
+        for part in parts:
+            output.extend(part)
+        return output
+
+    def column_names(self):
+        names = {}
+        for chunk_names, _ in sorted(
+            self.chunks.items(), key=lambda item: item[1][0][0]
+        ):
+            names.update(dict.fromkeys(chunk_names))
+        return list(names)
+
+    def to_frame(self):
+        if len(self.chunks) == 1:
+            [(names, (_, rows))] = self.chunks.items()
+            return pd.DataFrame.from_records(rows, columns=list(names))
+
+        chunk_columns = [
+            (dict(zip(names, zip(*rows))), len(rows))
+            for names, (_, rows) in self.chunks.items()
+        ]
+        order = np.argsort(
+            np.concatenate(
+                [positions for positions, _ in self.chunks.values()] + [[]]
+            ).astype(np.int64),
+            kind="stable",
+        )
+        reorder = itemgetter(*order.tolist()) if len(order) > 1 else lambda x: x
+
+        data = {}
+        for name in self.column_names():
+            values = []
+            for columns, num_rows in chunk_columns:
+                if name in columns:
+                    values.extend(columns[name])
+                else:
+                    values.extend([np.nan] * num_rows)
+            data[name] = list(reorder(values))
+        return pd.DataFrame(data)
+
+
+# Quality-dimension scores are kept out of the row tuples in a float32 matrix
+# with one column per known dimension id, NaN where a review has no score.
+class ScoredRows(ColumnarRows):
+    def __init__(self, score_names: dict = QUALITY_DIM_ID_MAPPING):
+        super().__init__()
+        self.score_names = score_names
+        self.score_index = {score_id: i for i, score_id in enumerate(score_names)}
+        self.empty_scores = array("f", [np.nan] * len(score_names))
+        self.scores = array("f")
+
+    def append_scored(self, names: tuple, values: tuple, scores: dict):
+        offset = len(self.scores)
+        self.scores.extend(self.empty_scores)
+        for score_id, score in scores.items():
+            column = self.score_index.get(score_id)
+            if (column is not None) and (score is not None):
+                self.scores[offset + column] = score
+        self.append_values(names, values)
+
+    def extend(self, other: "ScoredRows"):
+        super().extend(other)
+        self.scores.extend(other.scores)
+
+    def score_matrix(self):
+        return (
+            np.frombuffer(self.scores, dtype=np.float32)
+            .reshape(-1, len(self.score_names))
+            .copy()
+        )
+
+    def to_frame(self):
+        frame = super().to_frame()
+        matrix = self.score_matrix()
+        # only dimensions that were scored at least once become columns
+        observed = ~np.isnan(matrix).all(axis=0)
+        scores = pd.DataFrame(
+            matrix[:, observed],
+            columns=[
+                name for name, seen in zip(self.score_names.values(), observed) if seen
+            ],
+            index=frame.index,
+        )
+        return pd.concat([frame, scores], axis=1)
@@ -18,6 +18,115 @@ ONBOARDING_BATCH_MAP = {
     "441": set([1379]),
 }
 
+MAX_CONCURRENCY = 8
+MAX_CONNECTIONS_PER_HOST = 6
+HTTP_TIMEOUT = 300
+
+CACHE_DIR = ".labeling_cache"
+SNAPSHOT_OVERLAP_MINUTES = 10
+FULL_SYNC_MAX_AGE_HOURS = 24 * 7
+MANIFEST_DIR = "run_manifests"
+
+# chunked uploads: uncompressed JSON bytes of rows per chunk, and retries per chunk
+UPLOAD_CHUNK_BYTES = 2 * 1024 * 1024
+UPLOAD_RETRIES = 3
+UPLOAD_BACKOFF = 2.0
+UPLOAD_TIMEOUT = 120
+
+# delta uploads: the columns that identify a row of each sheet, sheets missing
+# from here are always sent whole
+PUBLISH_FULL_REFRESH_HOURS = 24
+DELTA_SHEET_KEYS = {
+    "Author_summary": ("Author", "VersionUpdatedDate", "Rework_or_NewTask"),
+    "First_Reviewer_summary": ("Reviewer", "SubmittedDate"),
+    "Second_Reviewer_summary": ("Reviewer", "SubmittedDate"),
+    "Overall_summary": ("Date",),
+    "author_score": ("Author", "VersionUpdatedDate"),
+    "Task_Status": ("Subject",),
+    "Task_Status_2": ("Subject", "Is_Question_Correct"),
+    "AuthorSummary": ("Author", "VersionCreatedDate"),
+    "ReviewerSummary": ("Reviewer", "SubmittedDate"),
+    "DailySummary": ("Date",),
+    "SubjectSummary": ("Subject",),
+    "Reworks": ("TaskID",),
+    "Pending_Reviews": ("TaskID",),
+    "Pending_Status": ("batchName",),
+    "Complete_Batches": ("batchName",),
+    "StatusSheet": ("TaskID",),
+    "CompletedSamples": ("TaskID",),
+}
+
+# Rules are (label, conditions) pairs evaluated in order, first match wins.
+# A condition is a scalar (equality), a list (membership) or an
+# (operator, value) tuple such as ("<", 2).
+STATUS_RULES = [
+    ("Unclaimed", {"tab": "unclaimed"}),
+    ("Inprogress", {"tab": "inprogress"}),
+    (
+        "Ready For Review",
+        {"tab": "pending_review", "num_positive_reviews": 0, "reworked": False},
+    ),
+    ("1st Review Comments Added", {"tab": "rework", "num_positive_reviews": 0}),
+    (
+        "1st Review Comments Addressed",
+        {"tab": "pending_review", "num_positive_reviews": 0, "reworked": True},
+    ),
+    (
+        "1st Review Done",
+        {"tab": ["reviewed", "delivery"], "num_positive_reviews": ("<", 2)},
+    ),
+    ("2nd Review Comments Added", {"tab": "rework", "num_positive_reviews": (">", 0)}),
+    (
+        "2nd Review Comments Addressed",
+        {"tab": "pending_review", "num_positive_reviews": (">", 0), "reworked": True},
+    ),
+    (
+        "2nd Review Done",
+        {"tab": ["reviewed", "delivery"], "num_positive_reviews": (">", 1)},
+    ),
+    ("Delivered", {"tab": "delivery"}),
+]
+INVALID_STATUS = "Invalid Status"
+
+# Extra rules checked before STATUS_RULES for a given project id
+PROJECT_STATUS_RULES = {}
+
+PENDING_REVIEW_RULES = [
+    ("pending_review_with_reviewer", {"tab": "pending_review", "HasReviewer": True}),
+    (
+        "pending_review_without_reviewer",
+        {"tab": "pending_review", "HasReviewer": False},
+    ),
+]
+
+# Statement keys every task row needs, on top of the ones a report asks for
+BASE_METADATA_KEYS = ("batchId", "rc_form_response_numberOfCorrectLinks")
+SUBJECT_METADATA_KEYS = {
+    "254": ("rc_form_response_datasetDomainAndTopic",),
+    "366": ("rc_form_response_subjectAndUnit",),
+    "441": ("rc_form_response_subjectAndUnit",),
+    "448": ("batchName",),
+    "449": ("batchName",),
+    "471": ("batchName",),
+    "472": ("batchName",),
+    "547": ("subject",),
+}
+
+# Repeated string columns of the parsed frames, kept as categoricals so the
+# report groupbys and crosstabs work on integer codes
+CATEGORY_COLUMNS = (
+    "Author",
+    "Reviewer",
+    "tab",
+    "task_status",
+    "form_stage",
+    "Subject",
+    "batchName",
+    "stage",
+    "Reviewed",
+    "Rework_or_NewTask",
+)
+
 QUALITY_DIM_ID_MAPPING = {
     1: "Completeness",
     2: "Language Quality",
@@ -31,32 +140,34 @@ QUALITY_DIM_ID_MAPPING = {
     172: "Question Discardability",
 }
 
+LABELING_BASE_URL = "https://labeling-g.turing.com"
+
 UNCLAIMED = (
     "unclaimed",
-    "https://labeling-g.turing.com/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=$isClaimed||$eq||false&filter[2]=status||$eq||pending&filter[3]=projectId||$eq||{project_id}&filter[4]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[3]=versions.author||id,turingEmail&join[4]=reviews||id,submittedAt,followupRequired,status,score,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,turingEmail&join[7]=statusHistory||id,formStage&join[8]=currentUser||id,turingEmail",
+    "{base_url}/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=$isClaimed||$eq||false&filter[2]=status||$eq||pending&filter[3]=projectId||$eq||{project_id}&filter[4]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[3]=versions.author||id,turingEmail&join[4]=reviews||id,submittedAt,followupRequired,status,score,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,turingEmail&join[7]=statusHistory||id,formStage&join[8]=currentUser||id,turingEmail",
 )
 
 INPROGRESS = (
     "inprogress",
-    "https://labeling-g.turing.com/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=$isClaimed||$eq||true&filter[2]=status||$eq||labeling&filter[3]=status||$in||labeling,validating&filter[4]=projectId||$eq||{project_id}&filter[5]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[3]=versions.author||id,turingEmail&join[4]=reviews||id,submittedAt,followupRequired,status,score,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,turingEmail&join[7]=statusHistory||id,formStage&join[8]=currentUser||id,turingEmail",
+    "{base_url}/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=$isClaimed||$eq||true&filter[2]=status||$eq||labeling&filter[3]=status||$in||labeling,validating&filter[4]=projectId||$eq||{project_id}&filter[5]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[3]=versions.author||id,turingEmail&join[4]=reviews||id,submittedAt,followupRequired,status,score,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,turingEmail&join[7]=statusHistory||id,formStage&join[8]=currentUser||id,turingEmail",
 )
 
 REWORK = (
     "rework",
-    "https://labeling-g.turing.com/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=status||$eq||rework&filter[2]=batch.status||$ne||draft&filter[3]=projectId||$eq||{project_id}&filter[4]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[3]=versions.author||id,turingEmail&join[4]=reviews||id,submittedAt,followupRequired,status,score,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,turingEmail&join[7]=statusHistory||id,formStage&join[8]=currentUser||id,turingEmail",
+    "{base_url}/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=status||$eq||rework&filter[2]=batch.status||$ne||draft&filter[3]=projectId||$eq||{project_id}&filter[4]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[3]=versions.author||id,turingEmail&join[4]=reviews||id,submittedAt,followupRequired,status,score,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,turingEmail&join[7]=statusHistory||id,formStage&join[8]=currentUser||id,turingEmail",
 )
 
 PENDING_REVIEW = (
     "pending_review",
-    "https://labeling-g.turing.com/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=status||$eq||completed&filter[2]=$needFollowup||$eq||true&filter[3]=projectId||$eq||{project_id}&filter[4]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=latestManualReview&join[3]=latestManualReview.review||id&join[4]=statusHistory||id,formStage&join[5]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[6]=versions.author||id,turingEmail&join[7]=reviews||id,submittedAt,status,score,followupRequired,conversationId,reviewerId,conversationVersionId,durationMinutes,qualityDimensionValues&join[8]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[9]=reviews.reviewer||id,turingEmail&join[10]=currentUser||id,turingEmail",
+    "{base_url}/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=status||$eq||completed&filter[2]=$needFollowup||$eq||true&filter[3]=projectId||$eq||{project_id}&filter[4]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=latestManualReview&join[3]=latestManualReview.review||id&join[4]=statusHistory||id,formStage&join[5]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[6]=versions.author||id,turingEmail&join[7]=reviews||id,submittedAt,status,score,followupRequired,conversationId,reviewerId,conversationVersionId,durationMinutes,qualityDimensionValues&join[8]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[9]=reviews.reviewer||id,turingEmail&join[10]=currentUser||id,turingEmail",
 )
 
 REVIEWED = (
     "reviewed",
-    "https://labeling-g.turing.com/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=latestDeliveryBatch.deliveryBatch||$isnull&filter[2]=$isReviewed||$eq||true&filter[3]=status||$eq||completed&filter[4]=batch.status||$ne||draft&filter[5]=manualReview.followupRequired||$eq||false&filter[6]=projectId||$eq||{project_id}&filter[7]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=latestManualReview&join[3]=latestManualReview.review||id&join[4]=reviews||id,submittedAt,status,score,followupRequired,conversationId,reviewerId,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,turingEmail&join[7]=latestDeliveryBatch&join[8]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[9]=versions.author||id,turingEmail&join[10]=statusHistory||id,formStage&join[11]=currentUser||id,turingEmail",
+    "{base_url}/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=latestDeliveryBatch.deliveryBatch||$isnull&filter[2]=$isReviewed||$eq||true&filter[3]=status||$eq||completed&filter[4]=batch.status||$ne||draft&filter[5]=manualReview.followupRequired||$eq||false&filter[6]=projectId||$eq||{project_id}&filter[7]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=latestManualReview&join[3]=latestManualReview.review||id&join[4]=reviews||id,submittedAt,status,score,followupRequired,conversationId,reviewerId,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,turingEmail&join[7]=latestDeliveryBatch&join[8]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[9]=versions.author||id,turingEmail&join[10]=statusHistory||id,formStage&join[11]=currentUser||id,turingEmail",
 )
 
 DELIVERY = (
     "delivery",
-    "https://labeling-g.turing.com/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=latestDeliveryBatch.deliveryBatch||$notnull&filter[2]=$isReviewed||$eq||true&filter[3]=status||$eq||completed&filter[4]=batch.status||$ne||draft&filter[5]=manualReview.followupRequired||$eq||false&filter[6]=projectId||$eq||{project_id}&filter[7]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=latestManualReview&join[3]=latestManualReview.review||id&join[4]=reviews||id,submittedAt,status,score,followupRequired,conversationId,reviewerId,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,name,turingEmail&join[7]=latestDeliveryBatch&join[8]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[9]=versions.author||id,turingEmail&join[10]=latestDeliveryBatch.deliveryBatch||name&join[11]=statusHistory||id,formStage&join[12]=currentUser||id,turingEmail",
+    "{base_url}/api/conversations/download-filtered-conversations/json?limit=10&page=1&filter[0]=batch.status||$ne||draft&filter[1]=latestDeliveryBatch.deliveryBatch||$notnull&filter[2]=$isReviewed||$eq||true&filter[3]=status||$eq||completed&filter[4]=batch.status||$ne||draft&filter[5]=manualReview.followupRequired||$eq||false&filter[6]=projectId||$eq||{project_id}&filter[7]=batch.status||$ne||draft&join[0]=project||id&join[1]=batch||id,status,projectId&join[2]=latestManualReview&join[3]=latestManualReview.review||id&join[4]=reviews||id,submittedAt,status,score,followupRequired,conversationId,reviewerId,conversationVersionId,durationMinutes&join[5]=reviews.qualityDimensionValues||id,score,qualityDimensionId&join[6]=reviews.reviewer||id,name,turingEmail&join[7]=latestDeliveryBatch&join[8]=versions||id,durationMinutes,createdAt,updatedAt,author,formStage&join[9]=versions.author||id,turingEmail&join[10]=latestDeliveryBatch.deliveryBatch||name&join[11]=statusHistory||id,formStage&join[12]=currentUser||id,turingEmail",
 )
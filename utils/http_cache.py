@@ -0,0 +1,122 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+
+CHUNK_SIZE = 1 << 16
+
+
+class ResponseCache:
+    def __init__(self, directory: str, max_age: float):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_age = max_age
+
+    def paths(self, url: str):
+        path = os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest())
+        return f"{path}.json", f"{path}.gz"
+
+    def lookup(self, url: str):
+        meta_path, body_path = self.paths(url)
+        try:
+            with open(meta_path) as file:
+                entry = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if (entry.get("url") != url) or (not os.path.exists(body_path)):
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict):
+        return time.time() - entry["stored_at"] < self.max_age
+
+    def validators(self, entry: dict):
+        headers = {}
+        if "etag" in entry["headers"]:
+            headers["If-None-Match"] = entry["headers"]["etag"]
+        if "last-modified" in entry["headers"]:
+            headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+        return headers
+
+    def store_entry(self, url: str, headers: dict):
+        meta_path, _ = self.paths(url)
+        entry = {"url": url, "stored_at": time.time(), "headers": headers}
+        with open(f"{meta_path}.{os.getpid()}.tmp", "w") as file:
+            json.dump(entry, file)
+        os.replace(f"{meta_path}.{os.getpid()}.tmp", meta_path)
+        return entry
+
+    def touch(self, url: str, entry: dict):
+        return self.store_entry(url, entry["headers"])
+
+    def read_chunks(self, url: str):
+        _, body_path = self.paths(url)
+        with gzip.open(body_path, "rb") as file:
+            while chunk := file.read(CHUNK_SIZE):
+                yield chunk
+
+    def read(self, url: str):
+        _, body_path = self.paths(url)
+        with gzip.open(body_path, "rb") as file:
+            return file.read()
+
+    def writer(self, url: str, headers):
+        return CacheWriter(self, url, headers)
+
+
+class CacheWriter:
+    def __init__(self, cache: ResponseCache, url: str, headers):
+        self.cache = cache
+        self.url = url
+        # bodies are stored decoded, so the transfer headers no longer apply
+        self.headers = {
+            key.lower(): value
+            for key, value in headers.items()
+            if key.lower()
+            not in ("content-encoding", "content-length", "transfer-encoding")
+        }
+        _, self.body_path = cache.paths(url)
+        self.tmp_path = f"{self.body_path}.{os.getpid()}.{id(self)}.tmp"
+        self.file = gzip.open(self.tmp_path, "wb", compresslevel=5)
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.body_path)
+        self.cache.store_entry(self.url, self.headers)
+
+    def close(self):
+        # a body that was not read to the end is never stored
+        if not self.file.closed:
+            self.file.close()
+            os.remove(self.tmp_path)
+
+
+class CachedResponse:
+    status_code = 200
+
+    def __init__(self, cache: ResponseCache, url: str, entry: dict):
+        self.cache = cache
+        self.url = url
+        self.headers = entry["headers"]
+
+    async def aiter_bytes(self):
+        for chunk in self.cache.read_chunks(self.url):
+            yield chunk
+
+
+class CachingResponse:
+    def __init__(self, response, writer: CacheWriter):
+        self.response = response
+        self.writer = writer
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    async def aiter_bytes(self):
+        async for chunk in self.response.aiter_bytes():
+            self.writer.write(chunk)
+            yield chunk
+        self.writer.commit()
@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import uuid
+import platform
+import resource
+import tracemalloc
+from contextvars import ContextVar
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from .profiling import ProfileSettings
+
+# the records list is shared by every task of a run, labels and the stage path
+# are set per task, so concurrent projects never mix up their stages
+current_records = ContextVar("current_records", default=None)
+current_labels = ContextVar("current_labels", default={})
+current_frames = ContextVar("current_frames", default=())
+current_profile = ContextVar("current_profile", default=None)
+PROMETHEUS_LABELS = ("stage", "project_id", "report", "tab")
+
+
+def max_rss_bytes(who=resource.RUSAGE_SELF):
+    max_rss = resource.getrusage(who).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StageFrame:
+    def __init__(self, name: str, memory: bool):
+        self.name = name
+        self.memory = memory and tracemalloc.is_tracing()
+        self.child_peak = 0
+
+
+@contextmanager
+def stage(name: str, memory: bool = True, **fields):
+    records = current_records.get()
+    if records is None:
+        yield {}
+        return
+    frames = current_frames.get()
+    frame = StageFrame(name, memory)
+    path = "/".join([*(parent.name for parent in frames), name])
+    record = {"stage": path, **current_labels.get(), **fields}
+    profile = current_profile.get()
+    profiling = None
+    if (profile is not None) and profile.wants(name, path):
+        profiling = profile.start(path, current_labels.get())
+    if frame.memory:
+        # the traced peak is process wide, so it is reset per stage and handed up
+        # to the enclosing stage on exit
+        start_traced, outer_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    token = current_frames.set((*frames, frame))
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    except BaseException as error:
+        record["error"] = type(error).__name__
+        raise
+    finally:
+        record["wall_seconds"] = time.perf_counter() - start_wall
+        record["cpu_seconds"] = time.process_time() - start_cpu
+        record["max_rss_bytes"] = max_rss_bytes()
+        current_frames.reset(token)
+        if profiling is not None:
+            record["profile"] = profile.finish(profiling)
+        if frame.memory:
+            peak = max(tracemalloc.get_traced_memory()[1], frame.child_peak)
+            # allocated on top of what was already live when the stage started
+            record["tracemalloc_peak_bytes"] = peak - start_traced
+            if frames and frames[-1].memory:
+                frames[-1].child_peak = max(frames[-1].child_peak, outer_peak, peak)
+        records.append(record)
+
+
+def instrumented(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(func.__name__) as record:
+            result = func(*args, **kwargs)
+            if hasattr(result, "shape"):
+                record["rows"] = result.shape[0]
+            return result
+
+    return wrapper
+
+
+class StageSettings:
+    def __init__(self, trace_memory: bool = False, profile: ProfileSettings = None):
+        self.trace_memory = trace_memory
+        self.profile = profile
+
+    @contextmanager
+    def apply(self):
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        token = current_profile.set(self.profile)
+        try:
+            yield
+        finally:
+            current_profile.reset(token)
+            if started_tracing:
+                tracemalloc.stop()
+
+
+def collect_stages(func, name: str, labels: dict, settings: StageSettings, *args):
+    # runs in the worker process when reports are built in a pool, so the
+    # records travel back as the return value (or on the raised error)
+    records = []
+    tokens = (
+        current_records.set(records),
+        current_labels.set(labels),
+        current_frames.set(()),
+    )
+    try:
+        with settings.apply(), stage(name):
+            func(*args)
+    except Exception as error:
+        error.stage_records = records
+        raise
+    finally:
+        for var, token in zip(
+            (current_records, current_labels, current_frames), tokens
+        ):
+            var.reset(token)
+    return records
+
+
+class RunManifest:
+    def __init__(self, settings: StageSettings = None):
+        self.run_id = uuid.uuid4().hex
+        self.settings = StageSettings() if settings is None else settings
+        self.records = []
+        self.started_at = datetime.now(timezone.utc)
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+
+    @property
+    def name(self):
+        return f"run-{self.started_at:%Y%m%dT%H%M%S}-{self.run_id[:8]}"
+
+    @contextmanager
+    def activate(self):
+        token = current_records.set(self.records)
+        try:
+            with self.settings.apply():
+                yield self
+        finally:
+            current_records.reset(token)
+
+    def to_dict(self, failed=()):
+        return {
+            "run_id": self.run_id,
+            # positional arguments carry the bearer token and Apps Script URLs
+            "script": os.path.basename(sys.argv[0]),
+            "options": [arg.split("=")[0] for arg in sys.argv[1:] if arg[:2] == "--"],
+            "pid": os.getpid(),
+            "python": platform.python_version(),
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "wall_seconds": time.perf_counter() - self.start_wall,
+            "cpu_seconds": time.process_time() - self.start_cpu,
+            "max_rss_bytes": max_rss_bytes(),
+            "children_max_rss_bytes": max_rss_bytes(resource.RUSAGE_CHILDREN),
+            "failed": list(failed),
+            "stages": self.records,
+        }
+
+    def write(self, directory: str, failed=()):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.name}.json")
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(self.to_dict(failed), file, indent=1)
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    def write_prometheus(self, path: str, failed=()):
+        manifest = self.to_dict(failed)
+        series = {}
+        for record in self.records:
+            labels = tuple(
+                (key, str(record[key])) for key in PROMETHEUS_LABELS if key in record
+            )
+            # repeated calls of one stage, like make_share_json, become one series
+            totals = series.setdefault(labels, {"count": 0, "wall": 0.0, "cpu": 0.0})
+            totals["count"] += 1
+            totals["wall"] += record["wall_seconds"]
+            totals["cpu"] += record["cpu_seconds"]
+            totals["rows"] = totals.get("rows", 0) + record.get("rows", 0)
+            totals["bytes"] = totals.get("bytes", 0) + record.get("bytes", 0)
+
+        lines = []
+        for metric, key, help_text in (
+            ("labeling_stage_wall_seconds", "wall", "Wall time spent in a stage"),
+            ("labeling_stage_cpu_seconds", "cpu", "CPU time spent in a stage"),
+            ("labeling_stage_calls", "count", "Times a stage ran"),
+            ("labeling_stage_rows", "rows", "Rows produced by a stage"),
+            ("labeling_stage_bytes", "bytes", "Bytes read or sent by a stage"),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            for labels, totals in series.items():
+                label_text = ",".join(
+                    f'{name}="{value.replace(chr(34), "")}"' for name, value in labels
+                )
+                lines.append(f"{metric}{{{label_text}}} {totals[key]}")
+        for metric, value, help_text in (
+            ("labeling_run_wall_seconds", manifest["wall_seconds"], "Run wall time"),
+            ("labeling_run_cpu_seconds", manifest["cpu_seconds"], "Run CPU time"),
+            ("labeling_run_max_rss_bytes", manifest["max_rss_bytes"], "Peak RSS"),
+            ("labeling_run_failed_reports", len(failed), "Reports that failed"),
+            (
+                "labeling_run_finished_timestamp_seconds",
+                time.time(),
+                "When the run finished",
+            ),
+        ):
+            lines += [
+                f"# HELP {metric} {help_text}",
+                f"# TYPE {metric} gauge",
+                f"{metric} {value}",
+            ]
+
+        # the textfile collector may read at any time, so swap the file in whole
+        with open(f"{path}.tmp", "w") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(f"{path}.tmp", path)
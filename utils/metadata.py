@@ -0,0 +1,49 @@
+from functools import lru_cache
+
+
+# A statement is a run of "**key** - value" blocks separated by blank lines and
+# followed by the question text, so the last block is never metadata.
+@lru_cache(maxsize=1 << 16)
+def parse_statement(statement: str):
+    metadata_dict = {
+        i[2 : i.rfind("**")]: i[i.rfind("** - ") + 5 :]
+        for i in statement.split("\n\n")[:-1]
+    }
+    if "id" in metadata_dict:
+        metadata_dict["ID"] = metadata_dict.pop("id")
+    return metadata_dict
+
+
+@lru_cache(maxsize=1 << 16)
+def scan_statement(statement: str, markers: tuple):
+    metadata_dict = {}
+    for key, marker in markers:
+        start = statement.rfind(marker)
+        while start > 0 and statement[start - 2 : start] != "\n\n":
+            start = statement.rfind(marker, 0, start)
+        if start == -1:
+            continue
+        start += len(marker)
+        end = statement.find("\n\n", start)
+        if end != -1:
+            metadata_dict[key] = statement[start:end]
+    return metadata_dict
+
+
+# memoized on the statement and the keys, so a conversation listed under several
+# tabs or read by several reports is only scanned once per key set
+class StatementScanner:
+    def __init__(self, keys):
+        self.markers = tuple(
+            ("ID" if key == "id" else key, f"**{key}** - ")
+            for key in dict.fromkeys(keys)
+        )
+
+    def __call__(self, statement: str):
+        return scan_statement(statement, self.markers)
+
+
+def make_statement_parser(keys=None):
+    if keys is None:
+        return parse_statement
+    return StatementScanner(keys)
@@ -0,0 +1,132 @@
+import os
+import io
+import sys
+import pstats
+import cProfile
+import threading
+from collections import Counter
+
+PROFILERS = ("cprofile", "sample")
+# only one profiler can own the interpreter's profile hook at a time
+active_profile = threading.Lock()
+
+
+class ProfileSettings:
+    def __init__(
+        self,
+        stages,
+        prefix: str,
+        profiler: str = "cprofile",
+        top: int = 30,
+        interval: float = 0.005,
+    ):
+        self.stages = set(stages)
+        self.prefix = prefix
+        self.profiler = profiler
+        self.top = top
+        self.interval = interval
+        self.count = 0
+
+    def wants(self, name: str, path: str):
+        return (name in self.stages) or (path in self.stages)
+
+    def output_path(self, path: str, labels: dict):
+        # stages can repeat (make_share_json) and run in several worker processes
+        self.count += 1
+        parts = [labels[key] for key in ("project_id", "report") if key in labels]
+        parts += [path.replace("/", "."), str(os.getpid()), str(self.count)]
+        return f"{self.prefix}.{'.'.join(parts)}"
+
+    def start(self, path: str, labels: dict):
+        if not active_profile.acquire(blocking=False):
+            return None
+        if self.profiler == "sample":
+            profiler = StackSampler(self.interval)
+        else:
+            profiler = CProfiler()
+        profiler.start()
+        return profiler, self.output_path(path, labels)
+
+    def finish(self, started):
+        profiler, output_path = started
+        try:
+            profiler.stop()
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            return profiler.write(output_path, self.top)
+        finally:
+            active_profile.release()
+
+
+class CProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, output_path: str, top: int):
+        self.profile.dump_stats(f"{output_path}.prof")
+        summary = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=summary).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(top)
+        stats.sort_stats("tottime").print_stats(top)
+        with open(f"{output_path}.txt", "w") as file:
+            file.write(summary.getvalue())
+        return f"{output_path}.prof"
+
+
+class StackSampler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                    f":{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def write(self, output_path: str, top: int):
+        # folded stacks, the input format of flamegraph.pl and speedscope
+        with open(f"{output_path}.collapsed", "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{';'.join(stack)} {count}\n")
+
+        total = sum(self.stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                inclusive[function] += count
+        lines = [f"{total} samples every {self.interval * 1000:g}ms", ""]
+        for title, counter in (("self", own), ("inclusive", inclusive)):
+            lines.append(f"{'samples':>8} {'%':>6}  {title}")
+            for function, count in counter.most_common(top):
+                lines.append(
+                    f"{count:>8} {100 * count / max(total, 1):6.1f}  {function}"
+                )
+            lines.append("")
+        with open(f"{output_path}.txt", "w") as file:
+            file.write("\n".join(lines))
+        return f"{output_path}.collapsed"
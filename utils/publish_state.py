@@ -0,0 +1,176 @@
+import os
+import json
+import sqlite3
+import hashlib
+from datetime import datetime, timedelta, timezone
+from .constants import DELTA_SHEET_KEYS, PUBLISH_FULL_REFRESH_HOURS
+from .snapshot import to_timestamp
+
+
+def fingerprint(row: list):
+    return hashlib.sha1(json.dumps(row).encode()).hexdigest()
+
+
+def key_rows(rows: list, keys):
+    header = rows[0]
+    if not all(key in header for key in keys):
+        return None
+    positions = [header.index(key) for key in keys]
+    keyed = {json.dumps([row[i] for i in positions]): row for row in rows[1:]}
+    # a key that repeats cannot be upserted, so the sheet goes out in full
+    return keyed if len(keyed) == len(rows) - 1 else None
+
+
+class PublishedStore:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS published_rows (
+                sheet TEXT NOT NULL,
+                key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (sheet, key)
+            );
+            CREATE TABLE IF NOT EXISTS published_sheets (
+                sheet TEXT PRIMARY KEY,
+                header TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+
+    def get_meta(self, key: str):
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def needs_full_refresh(self, max_age=timedelta(hours=PUBLISH_FULL_REFRESH_HOURS)):
+        last_full_refresh = self.get_meta("last_full_refresh")
+        return (last_full_refresh is None) or (
+            datetime.now(timezone.utc) - datetime.fromisoformat(last_full_refresh)
+            > max_age
+        )
+
+    def header(self, sheet: str):
+        row = self.connection.execute(
+            "SELECT header FROM published_sheets WHERE sheet = ?", (sheet,)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def fingerprints(self, sheet: str):
+        return dict(
+            self.connection.execute(
+                "SELECT key, fingerprint FROM published_rows WHERE sheet = ?", (sheet,)
+            )
+        )
+
+    def replace_sheet(self, sheet: str, header: list, keyed: dict):
+        self.connection.execute("DELETE FROM published_rows WHERE sheet = ?", (sheet,))
+        self.connection.execute(
+            "DELETE FROM published_sheets WHERE sheet = ?", (sheet,)
+        )
+        if keyed is None:
+            return
+        self.connection.execute(
+            "INSERT INTO published_sheets (sheet, header) VALUES (?, ?)",
+            (sheet, json.dumps(header)),
+        )
+        self.connection.executemany(
+            "INSERT INTO published_rows (sheet, key, fingerprint) VALUES (?, ?, ?)",
+            ((sheet, key, fingerprint(row)) for key, row in keyed.items()),
+        )
+
+    def commit(self, full_refresh: bool = False):
+        if full_refresh:
+            self.set_meta("last_full_refresh", to_timestamp(datetime.now(timezone.utc)))
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class Delta:
+    def __init__(self, store: PublishedStore, payload: dict, full_refresh: bool):
+        self.store = store
+        self.full_refresh = full_refresh
+        self.sheets = {}
+        self.payload = {}
+        keys, deletes = {}, {}
+        for name, value in payload.items():
+            if not isinstance(value, list):
+                self.payload[name] = value
+                continue
+            sheet_keys = DELTA_SHEET_KEYS.get(name)
+            keyed = None if sheet_keys is None else key_rows(value, sheet_keys)
+            self.sheets[name] = (value[0], keyed)
+            if full_refresh or (keyed is None) or (store.header(name) != value[0]):
+                self.payload[name] = value
+                continue
+            published = store.fingerprints(name)
+            self.payload[name] = [value[0]] + [
+                row
+                for key, row in keyed.items()
+                if published.get(key) != fingerprint(row)
+            ]
+            keys[name] = list(sheet_keys)
+            deletes[name] = [json.loads(key) for key in published if key not in keyed]
+        # sheets listed in keys carry only changed rows, every other sheet is whole
+        self.payload["publish"] = {
+            "mode": "delta" if keys else "full",
+            "keys": keys,
+            "deletes": deletes,
+        }
+
+    def commit(self):
+        for name, (header, keyed) in self.sheets.items():
+            self.store.replace_sheet(name, header, keyed)
+        self.store.commit(self.full_refresh)
+
+
+class DeltaPublisher:
+    def __init__(self, directory: str, full_refresh: bool = False, max_age=None):
+        self.directory = directory
+        self.force_full_refresh = full_refresh
+        self.max_age = (
+            timedelta(hours=PUBLISH_FULL_REFRESH_HOURS) if max_age is None else max_age
+        )
+
+    def store(self, appscript_url: str, project_id: str):
+        digest = hashlib.sha256(appscript_url.encode()).hexdigest()[:16]
+        return PublishedStore(
+            os.path.join(self.directory, f"{digest}-{project_id}.sqlite")
+        )
+
+    def prepare(self, store: PublishedStore, payload: dict):
+        full_refresh = self.force_full_refresh or store.needs_full_refresh(self.max_age)
+        return Delta(store, payload, full_refresh)
+
+
+def apply_delta(sheets: dict, payload: dict):
+    # reference for the receiving side: sheets maps a sheet name to its current
+    # rows (header first) and comes back with the payload applied
+    publish = payload.get("publish", {"keys": {}, "deletes": {}})
+    sheets = dict(sheets)
+    for name, value in payload.items():
+        if not isinstance(value, list):
+            continue
+        if name not in publish["keys"]:
+            sheets[name] = value
+            continue
+        header = value[0]
+        positions = [header.index(key) for key in publish["keys"][name]]
+        rows = {
+            json.dumps([row[i] for i in positions]): row for row in sheets[name][1:]
+        }
+        for key in publish["deletes"].get(name, []):
+            rows.pop(json.dumps(key), None)
+        for row in value[1:]:
+            rows[json.dumps([row[i] for i in positions])] = row
+        sheets[name] = [header] + list(rows.values())
+    return sheets
@@ -0,0 +1,93 @@
+import os
+import re
+import gzip
+import hashlib
+from urllib.parse import urlsplit, unquote
+from .constants import UNCLAIMED, INPROGRESS, REWORK, PENDING_REVIEW, REVIEWED, DELIVERY
+
+TAB_URLS = (UNCLAIMED, INPROGRESS, REWORK, PENDING_REVIEW, REVIEWED, DELIVERY)
+EMAIL_PATTERN = re.compile(rb"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PROJECT_ID_PATTERN = re.compile(r"projectId\|\|\$eq\|\|([^&]+)")
+UPDATED_SINCE_PATTERN = re.compile(r"&filter\[\d+\]=updatedAt\|\|\$gte\|\|([^&]+)")
+
+
+def scrub_email(match: re.Match):
+    digest = hashlib.sha256(match.group(0).lower()).hexdigest()[:12]
+    return f"user-{digest}@example.com".encode()
+
+
+def scrub_emails(body: bytes):
+    # the same address always maps to the same stand-in, so joins still line up
+    return EMAIL_PATTERN.sub(scrub_email, body)
+
+
+def split_updated_since(path: str):
+    path = unquote(path)
+    match = UPDATED_SINCE_PATTERN.search(path)
+    if match is None:
+        return path, None
+    return path[: match.start()] + path[match.end() :], match.group(1)
+
+
+def match_tab_path(path: str):
+    path = unquote(path)
+    match = PROJECT_ID_PATTERN.search(path)
+    if match is None:
+        return None
+    project_id = match.group(1)
+    for tab, url in TAB_URLS:
+        if url.format(base_url="", project_id=project_id) == path:
+            return project_id, tab
+    return None
+
+
+def match_tab_url(url: str):
+    parts = urlsplit(url)
+    return match_tab_path(f"{parts.path}?{parts.query}")
+
+
+def fixture_path(directory: str, project_id: str, tab: str):
+    return os.path.join(directory, project_id, f"{tab}.json.gz")
+
+
+class Recorder:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def writer(self, url: str):
+        # incremental or otherwise filtered URLs are not full tab snapshots
+        match = match_tab_url(url)
+        if match is None:
+            return None
+        return RecordWriter(fixture_path(self.directory, *match))
+
+
+class RecordWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.chunks = []
+
+    def write(self, chunk: bytes):
+        self.chunks.append(chunk)
+
+    def commit(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=5) as file:
+            file.write(scrub_emails(b"".join(self.chunks)))
+        os.replace(tmp_path, self.path)
+        self.chunks = []
+
+
+class RecordingResponse:
+    def __init__(self, response, writer: RecordWriter):
+        self.response = response
+        self.writer = writer
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    async def aiter_bytes(self):
+        async for chunk in self.response.aiter_bytes():
+            self.writer.write(chunk)
+            yield chunk
+        self.writer.commit()
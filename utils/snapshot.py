@@ -0,0 +1,135 @@
+import os
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from .constants import SNAPSHOT_OVERLAP_MINUTES, FULL_SYNC_MAX_AGE_HOURS
+
+SCHEMA_VERSION = "3"
+
+
+def to_timestamp(value: datetime):
+    return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class SnapshotStore:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        if self.get_meta("schema_version") != SCHEMA_VERSION:
+            # older snapshots cannot be upgraded in place, the next sync is full
+            self.connection.executescript("""
+                DROP TABLE IF EXISTS conversations;
+                DELETE FROM meta;
+                """)
+            self.set_meta("schema_version", SCHEMA_VERSION)
+        # a conversation listed under several tabs is kept once per tab, seq is
+        # the order the API first returned it in
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id NOT NULL,
+                tab TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                updated_at TEXT,
+                body TEXT NOT NULL,
+                PRIMARY KEY (id, tab)
+            );
+            CREATE INDEX IF NOT EXISTS conversations_tab ON conversations (tab, seq);
+            """)
+        self.connection.commit()
+        self.synced_tabs = {}
+        (self.seq,) = self.connection.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM conversations"
+        ).fetchone()
+
+    def get_meta(self, key: str):
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def updated_since(
+        self,
+        overlap=timedelta(minutes=SNAPSHOT_OVERLAP_MINUTES),
+        max_age=timedelta(hours=FULL_SYNC_MAX_AGE_HOURS),
+    ):
+        high_water_mark = self.get_meta("high_water_mark")
+        last_full_sync = self.get_meta("last_full_sync")
+        if (high_water_mark is None) or (last_full_sync is None):
+            return None
+        if (
+            datetime.now(timezone.utc) - datetime.fromisoformat(last_full_sync)
+            > max_age
+        ):
+            return None
+        return to_timestamp(datetime.fromisoformat(high_water_mark) - overlap)
+
+    def clear(self):
+        self.connection.execute("DELETE FROM conversations")
+
+    def upsert(self, tab: str, conversation: dict):
+        self.synced_tabs.setdefault(conversation["id"], set()).add(tab)
+        self.seq += 1
+        # an update keeps the row where it was, only new conversations append
+        self.connection.execute(
+            "INSERT INTO conversations (id, tab, seq, updated_at, body) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (id, tab) DO UPDATE SET "
+            "updated_at = excluded.updated_at, body = excluded.body",
+            (
+                conversation["id"],
+                tab,
+                self.seq,
+                conversation.get("updatedAt"),
+                json.dumps(conversation),
+            ),
+        )
+
+    def conversations(self, tab: str):
+        for (body,) in self.connection.execute(
+            "SELECT body FROM conversations WHERE tab = ? ORDER BY seq", (tab,)
+        ):
+            yield json.loads(body)
+
+    def drop_moved(self, tabs):
+        # a conversation the sync returned is listed under exactly the tabs it
+        # came back from, the updatedAt filter returns it from each one of them
+        self.connection.executemany(
+            "DELETE FROM conversations WHERE id = ? AND tab = ?",
+            (
+                (conversation_id, tab)
+                for conversation_id, synced in self.synced_tabs.items()
+                for tab in tabs
+                if tab not in synced
+            ),
+        )
+
+    def commit(self, high_water_mark: str = None, full_sync: bool = False):
+        self.synced_tabs = {}
+        current = self.get_meta("high_water_mark")
+        if (high_water_mark is not None) and (
+            full_sync
+            or (current is None)
+            or (
+                datetime.fromisoformat(high_water_mark)
+                > datetime.fromisoformat(current)
+            )
+        ):
+            self.set_meta("high_water_mark", high_water_mark)
+        if full_sync:
+            self.set_meta("last_full_sync", to_timestamp(datetime.now(timezone.utc)))
+        self.connection.commit()
+
+    def rollback(self):
+        self.synced_tabs = {}
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
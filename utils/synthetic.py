@@ -0,0 +1,256 @@
+import os
+import gzip
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from .constants import (
+    QUALITY_DIM_ID_MAPPING,
+    SUBJECT_METADATA_KEYS,
+    ONBOARDING_BATCH_MAP,
+)
+from .replay import TAB_URLS, fixture_path
+
+SYNTHETIC_TABS = [tab for tab, _ in TAB_URLS]
+SYNTHETIC_START = datetime(2025, 5, 1, tzinfo=timezone.utc)
+SYNTHETIC_DAYS = 60
+FORM_STAGES = [None, "stage1 - Question Design", "stage2 - Evaluating Model Pass@4"]
+SUBJECTS = ["chemistry", "physics", "biology", "mathematics", "chmistry"]
+UNITS = ["unit1", "unit2", "unit3"]
+TAB_STATUS = {"unclaimed": "pending", "inprogress": "labeling", "rework": "rework"}
+MAX_STATUS_HISTORY = 3
+
+
+def timestamp(value: datetime):
+    return value.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def make_people(kind: str, count: int):
+    return [
+        {"id": i + 1, "turingEmail": f"{kind}{i}@example.com"} for i in range(count)
+    ]
+
+
+def tab_first_id(project_id: str, tab: str, num_tasks: int):
+    # distinct conversation id ranges per (project, tab), so tabs can be generated
+    # independently and still never collide
+    project_index = int(project_id) if project_id.isdigit() else 0
+    return (project_index * len(SYNTHETIC_TABS) + SYNTHETIC_TABS.index(tab)) * (
+        num_tasks
+    ) + 1
+
+
+class ConversationGenerator:
+    def __init__(
+        self,
+        project_id: str,
+        num_authors: int = 25,
+        num_reviewers: int = 10,
+        versions_per_task: int = 3,
+        review_rounds: int = 2,
+        num_batches: int = 4,
+        seed: int = 0,
+    ):
+        self.project_id = project_id
+        self.versions_per_task = max(versions_per_task, 1)
+        self.review_rounds = max(review_rounds, 1)
+        self.seed = seed
+        self.authors = make_people("author", num_authors)
+        # a few authors also review, like on the real projects
+        self.reviewers = make_people("reviewer", num_reviewers) + self.authors[:3]
+        self.batch_ids = sorted(ONBOARDING_BATCH_MAP.get(project_id, set())) + [
+            2000 + i for i in range(num_batches)
+        ]
+        self.dims = list(QUALITY_DIM_ID_MAPPING)
+        self.subject_keys = SUBJECT_METADATA_KEYS.get(project_id, ())
+        # ids for versions, reviews, dimension values and status history are
+        # derived from the conversation id, so every entity id stays unique
+        self.id_stride = (
+            self.versions_per_task * (1 + self.review_rounds * (1 + len(self.dims)))
+            + MAX_STATUS_HISTORY
+            + 1
+        )
+
+    def statement(self, rng: random.Random, conversation_id: int, batch_id: int):
+        subject = rng.choice(SUBJECTS)
+        metadata = {
+            "batchName": f"Batch_{batch_id}",
+            "batchId": str(batch_id),
+            "id": f"Q{conversation_id}",
+            "item_id": f"item-{conversation_id}",
+            "subject": subject,
+            "rc_form_response_subjectAndUnit": f"{subject}::{rng.choice(UNITS)}",
+            "rc_form_response_datasetDomainAndTopic": f"{subject}::{rng.choice(UNITS)}",
+            "rc_form_response_isQuestionCorrect": rng.choice(["Yes", "No"]),
+            "rc_form_response_hasImageInQuestionChoices": rng.choice(
+                ["No", "Yes", "Image not Required"]
+            ),
+        }
+        if rng.random() < 0.7:
+            metadata["rc_form_response_numberOfCorrectLinks"] = str(rng.randint(0, 4))
+        for key in self.subject_keys:
+            metadata.setdefault(key, f"{subject}::{rng.choice(UNITS)}")
+        return (
+            "".join(f"**{key}** - {value}\n\n" for key, value in metadata.items())
+            + f"Question {conversation_id}: {subject} problem statement."
+        )
+
+    def reviews(self, rng, tab, version, is_last, next_id, created_at):
+        if tab == "rework":
+            followup = True
+        elif tab == "pending_review":
+            # the newest version of a pending task is usually still unreviewed
+            if is_last and rng.random() < 0.5:
+                return [], created_at
+            followup = not is_last
+        else:
+            followup = not is_last
+        num_reviews = 1 if followup else rng.randint(1, self.review_rounds)
+        reviews = []
+        for round_index in range(num_reviews):
+            created_at += timedelta(minutes=rng.randint(10, 60 * 24))
+            reviews.append(
+                {
+                    "id": next_id(),
+                    "submittedAt": timestamp(created_at),
+                    "followupRequired": followup and (round_index == 0),
+                    "status": "published" if rng.random() > 0.05 else "draft",
+                    "score": rng.randint(1, 5),
+                    "conversationVersionId": version["id"],
+                    "durationMinutes": rng.randint(2, 60),
+                    "qualityDimensionValues": [
+                        {
+                            "id": next_id(),
+                            "qualityDimensionId": dim,
+                            "score": rng.randint(1, 5),
+                        }
+                        for dim in self.dims
+                        if rng.random() < 0.85
+                    ],
+                    "reviewer": (
+                        rng.choice(self.reviewers) if rng.random() > 0.02 else None
+                    ),
+                }
+            )
+        return reviews, created_at
+
+    def conversation(self, tab: str, conversation_id: int):
+        rng = random.Random(f"{self.seed}:{self.project_id}:{conversation_id}")
+        ids = iter(
+            range(
+                conversation_id * self.id_stride, (conversation_id + 1) * self.id_stride
+            )
+        )
+        next_id = ids.__next__
+        batch_id = rng.choice(self.batch_ids)
+        author = rng.choice(self.authors)
+
+        num_versions = {"unclaimed": 0, "inprogress": 1}.get(
+            tab, rng.randint(1, self.versions_per_task)
+        )
+        created_at = SYNTHETIC_START + timedelta(
+            minutes=rng.randint(0, 60 * 24 * SYNTHETIC_DAYS)
+        )
+        versions, reviews = [], []
+        for version_index in range(num_versions):
+            created_at += timedelta(minutes=rng.randint(30, 60 * 24))
+            duration = rng.randint(5, 120)
+            version = {
+                "id": next_id(),
+                "durationMinutes": duration,
+                "createdAt": timestamp(created_at),
+                "updatedAt": timestamp(created_at + timedelta(minutes=duration)),
+                "author": author if rng.random() > 0.02 else None,
+                "formStage": rng.choice(FORM_STAGES),
+            }
+            versions.append(version)
+            if tab in ("unclaimed", "inprogress"):
+                continue
+            version_reviews, created_at = self.reviews(
+                rng,
+                tab,
+                version,
+                version_index == num_versions - 1,
+                next_id,
+                created_at,
+            )
+            reviews.extend(version_reviews)
+
+        conversation = {
+            "id": conversation_id,
+            "batchId": batch_id,
+            "statement": self.statement(rng, conversation_id, batch_id),
+            "status": TAB_STATUS.get(tab, "completed"),
+            "updatedAt": timestamp(created_at),
+            "currentUser": None if tab == "unclaimed" else author,
+            "versions": versions,
+            "reviews": reviews,
+            "statusHistory": [
+                {"id": next_id(), "formStage": rng.choice(FORM_STAGES)}
+                for _ in range(rng.randint(0, MAX_STATUS_HISTORY))
+            ],
+        }
+        if tab == "delivery":
+            conversation["latestDeliveryBatch"] = {
+                "deliveryBatch": {"name": f"Delivery_{rng.randint(1, 5)}"}
+            }
+        elif tab == "reviewed":
+            conversation["latestDeliveryBatch"] = None
+        return conversation
+
+    def conversations(self, tab: str, num_tasks: int, first_id: int = None):
+        if first_id is None:
+            first_id = tab_first_id(self.project_id, tab, num_tasks)
+        for conversation_id in range(first_id, first_id + num_tasks):
+            yield self.conversation(tab, conversation_id)
+
+
+def iter_json_array(items):
+    # one element at a time, so memory stays flat however many tasks are written
+    separator = "["
+    empty = True
+    for item in items:
+        yield separator + json.dumps(item)
+        separator = ", "
+        empty = False
+    yield "[]" if empty else "]"
+
+
+def write_conversations(path: str, conversations):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if path.endswith(".gz"):
+        file = gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=5)
+    else:
+        file = open(tmp_path, "w", encoding="utf-8")
+    with file:
+        for part in iter_json_array(conversations):
+            file.write(part)
+    os.replace(tmp_path, path)
+
+
+def write_tab(directory: str, project_id: str, tab: str, num_tasks: int, kwargs):
+    path = fixture_path(directory, project_id, tab)
+    generator = ConversationGenerator(project_id, **kwargs)
+    write_conversations(path, generator.conversations(tab, num_tasks))
+    return path
+
+
+def write_fixtures(
+    directory: str,
+    project_ids,
+    num_tasks: int,
+    tabs=SYNTHETIC_TABS,
+    jobs: int = 1,
+    **kwargs,
+):
+    tab_args = [
+        (directory, project_id, tab, num_tasks, kwargs)
+        for project_id in project_ids
+        for tab in tabs
+    ]
+    if jobs <= 1:
+        return [write_tab(*args) for args in tab_args]
+    # every tab owns its id range, so tabs can be written in any order
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(write_tab, *zip(*tab_args)))
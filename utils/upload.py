@@ -0,0 +1,292 @@
+import gzip
+import json
+import time
+import uuid
+import base64
+from contextvars import ContextVar
+import requests
+from .constants import (
+    UPLOAD_CHUNK_BYTES,
+    UPLOAD_RETRIES,
+    UPLOAD_BACKOFF,
+    UPLOAD_TIMEOUT,
+)
+from .instrumentation import stage
+from .publish_state import DeltaPublisher
+
+UPLOAD_MODES = ("single", "chunked")
+PAYLOAD_FORMATS = ("rows", "columnar")
+UPLOAD_VERSION = 1
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def is_sheet(value):
+    return isinstance(value, list)
+
+
+def json_body(payload: dict):
+    # what requests sends for json=, encoded here so the bytes can be counted,
+    # the redirected request Apps Script answers with has no body
+    return json.dumps(payload, allow_nan=False).encode()
+
+
+def split_rows(rows: list, chunk_bytes: int):
+    # bounded by the uncompressed JSON size of the rows, every part gets at
+    # least one row however large it is
+    part, part_bytes = [], 0
+    for row in rows:
+        row_bytes = len(json.dumps(row)) + 2
+        if part and (part_bytes + row_bytes > chunk_bytes):
+            yield part
+            part, part_bytes = [], 0
+        part.append(row)
+        part_bytes += row_bytes
+    if part or (not rows):
+        yield part
+
+
+def encode_columns(rows: list):
+    # a column of repeated values (emails, batch names, statuses) is sent once
+    # per distinct value plus an integer code per row, other columns as they are
+    columns = []
+    for values in zip(*rows):
+        codes = {}
+        for value in values:
+            codes.setdefault(value, len(codes))
+        if len(codes) * 2 <= len(values):
+            columns.append(
+                {"dictionary": list(codes), "codes": [codes[value] for value in values]}
+            )
+        else:
+            columns.append({"values": list(values)})
+    return {"rowCount": len(rows), "columns": columns}
+
+
+def decode_columns(encoded: dict):
+    columns = [
+        (
+            [column["dictionary"][code] for code in column["codes"]]
+            if "dictionary" in column
+            else column["values"]
+        )
+        for column in encoded["columns"]
+    ]
+    if not columns:
+        return [[] for _ in range(encoded["rowCount"])]
+    return [list(row) for row in zip(*columns)]
+
+
+def encode_sheet(rows: list):
+    return {"header": rows[0], **encode_columns(rows[1:])}
+
+
+def decode_sheet(sheet: dict):
+    return [sheet["header"]] + decode_columns(sheet)
+
+
+def encode_payload(payload: dict):
+    encoded = {
+        key: encode_sheet(value) if is_sheet(value) else value
+        for key, value in payload.items()
+    }
+    encoded["sheetFormat"] = "columnar"
+    return encoded
+
+
+def decode_payload(payload: dict):
+    # reference decoder for the receiving side, see the README for the contract
+    if payload.get("sheetFormat") != "columnar":
+        return payload
+    return {
+        key: (
+            decode_sheet(value)
+            if isinstance(value, dict) and "header" in value
+            else value
+        )
+        for key, value in payload.items()
+        if key != "sheetFormat"
+    }
+
+
+def encode_rows(rows: list, sheet_format: str = "rows"):
+    if sheet_format == "columnar":
+        rows = encode_columns(rows)
+    data = gzip.compress(json.dumps(rows, separators=(",", ":")).encode(), 6)
+    return base64.b64encode(data).decode("ascii")
+
+
+def decode_rows(data: str, encoding: str = "gzip+base64"):
+    rows = json.loads(gzip.decompress(base64.b64decode(data)))
+    return decode_columns(rows) if encoding.startswith("columnar+") else rows
+
+
+def make_envelopes(
+    payload: dict, chunk_bytes: int = UPLOAD_CHUNK_BYTES, sheet_format: str = "rows"
+):
+    fields = {key: value for key, value in payload.items() if not is_sheet(value)}
+    parts = []
+    for sheet, value in payload.items():
+        if is_sheet(value):
+            sheet_parts = list(split_rows(value, chunk_bytes))
+            parts += [
+                (sheet, index, len(sheet_parts), rows)
+                for index, rows in enumerate(sheet_parts)
+            ]
+    run_id = uuid.uuid4().hex
+    return [
+        {
+            **fields,
+            "upload": {
+                "version": UPLOAD_VERSION,
+                "runId": run_id,
+                "chunkIndex": chunk_index,
+                "chunkCount": len(parts),
+                "sheet": sheet,
+                "part": part,
+                "parts": num_parts,
+                "encoding": (
+                    "columnar+gzip+base64"
+                    if sheet_format == "columnar"
+                    else "gzip+base64"
+                ),
+            },
+            "data": encode_rows(rows, sheet_format),
+        }
+        for chunk_index, (sheet, part, num_parts, rows) in enumerate(parts)
+    ]
+
+
+def assemble_envelopes(envelopes):
+    # reference decoder for the receiving side, see the README for the contract
+    envelopes = sorted(envelopes, key=lambda envelope: envelope["upload"]["chunkIndex"])
+    if len(envelopes) != envelopes[0]["upload"]["chunkCount"]:
+        raise ValueError("upload is missing chunks")
+    payload = {
+        key: value
+        for key, value in envelopes[0].items()
+        if key not in ("upload", "data")
+    }
+    for envelope in envelopes:
+        payload.setdefault(envelope["upload"]["sheet"], []).extend(
+            decode_rows(envelope["data"], envelope["upload"]["encoding"])
+        )
+    return payload
+
+
+class Uploader:
+    def __init__(
+        self,
+        mode: str = "single",
+        chunk_bytes: int = UPLOAD_CHUNK_BYTES,
+        retries: int = UPLOAD_RETRIES,
+        backoff: float = UPLOAD_BACKOFF,
+        timeout: float = UPLOAD_TIMEOUT,
+        delta: DeltaPublisher = None,
+        sheet_format: str = "rows",
+    ):
+        self.mode = mode
+        self.chunk_bytes = chunk_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.delta = delta
+        self.sheet_format = sheet_format
+
+    def post(self, appscript_url: str, payload: dict):
+        if (self.delta is None) or (not any(map(is_sheet, payload.values()))):
+            return self.send(appscript_url, payload)
+
+        store = self.delta.store(appscript_url, payload["projectID"])
+        try:
+            with stage("delta") as record:
+                delta = self.delta.prepare(store, payload)
+                record["mode"] = delta.payload["publish"]["mode"]
+                record["rows"] = sum(
+                    len(value) - 1
+                    for value in delta.payload.values()
+                    if is_sheet(value)
+                )
+                record["full_rows"] = sum(
+                    len(value) - 1 for value in payload.values() if is_sheet(value)
+                )
+                record["deletes"] = sum(
+                    map(len, delta.payload["publish"]["deletes"].values())
+                )
+            response = self.send(appscript_url, delta.payload)
+            # the published state only moves forward once the sheet has the rows
+            if response.ok:
+                delta.commit()
+            return response
+        finally:
+            store.close()
+
+    def send(self, appscript_url: str, payload: dict):
+        # status-only posts (a failed fetch) stay plain JSON in every mode
+        has_sheets = any(map(is_sheet, payload.values()))
+        if (self.mode == "single") or (not has_sheets):
+            if has_sheets and (self.sheet_format == "columnar"):
+                payload = encode_payload(payload)
+            with stage("post") as record:
+                body = json_body(payload)
+                response = requests.post(appscript_url, data=body, headers=JSON_HEADERS)
+                record["bytes"] = len(body)
+                record["status_code"] = response.status_code
+            return response
+
+        with stage("post") as record, requests.Session() as session:
+            envelopes = make_envelopes(payload, self.chunk_bytes, self.sheet_format)
+            record["chunks"] = len(envelopes)
+            record["bytes"] = 0
+            for envelope in envelopes:
+                body = json_body(envelope)
+                response = self.post_chunk(session, appscript_url, envelope, body)
+                record["bytes"] += len(body)
+            record["status_code"] = response.status_code
+        return response
+
+    def post_chunk(
+        self, session: requests.Session, appscript_url: str, envelope, body: bytes
+    ):
+        upload = envelope["upload"]
+        with stage(
+            "post_chunk",
+            chunk=upload["chunkIndex"],
+            sheet=upload["sheet"],
+            encoded_bytes=len(envelope["data"]),
+        ) as record:
+            for attempt in range(self.retries + 1):
+                record["attempts"] = attempt + 1
+                try:
+                    response = session.post(
+                        appscript_url,
+                        data=body,
+                        headers=JSON_HEADERS,
+                        timeout=self.timeout,
+                    )
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        response.raise_for_status()
+                        record["bytes"] = len(body)
+                        record["status_code"] = response.status_code
+                        return response
+                    error = requests.HTTPError(
+                        f"{response.status_code} for chunk {upload['chunkIndex']}",
+                        response=response,
+                    )
+                except (requests.ConnectionError, requests.Timeout) as request_error:
+                    error = request_error
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2**attempt)
+            raise error
+
+
+current_uploader = ContextVar("current_uploader", default=Uploader())
+
+
+def with_uploader(uploader: Uploader, func, *args):
+    # sets the uploader inside whichever process builds the report
+    token = current_uploader.set(uploader)
+    try:
+        return func(*args)
+    finally:
+        current_uploader.reset(token)
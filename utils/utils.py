@@ -1,7 +1,15 @@
+import os
+import sys
 import asyncio
-from urllib.parse import quote
-from collections import defaultdict
-import requests
+import operator
+import traceback
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlsplit
+from contextlib import asynccontextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+import httpx
+import ijson
 import numpy as np
 import pandas as pd
 from .constants import (
@@ -15,36 +23,444 @@ from .constants import (
     PROJECT_IDS_4,
     ONBOARDING_BATCH_MAP,
     QUALITY_DIM_ID_MAPPING,
+    MAX_CONCURRENCY,
+    MAX_CONNECTIONS_PER_HOST,
+    HTTP_TIMEOUT,
+    CACHE_DIR,
+    STATUS_RULES,
+    INVALID_STATUS,
+    PROJECT_STATUS_RULES,
+    BASE_METADATA_KEYS,
+    SUBJECT_METADATA_KEYS,
+    LABELING_BASE_URL,
+    CATEGORY_COLUMNS,
+    MANIFEST_DIR,
+    UPLOAD_CHUNK_BYTES,
+    UPLOAD_RETRIES,
+    PUBLISH_FULL_REFRESH_HOURS,
+)
+from .snapshot import SnapshotStore
+from .columnar import ColumnarRows, ScoredRows
+from .metadata import make_statement_parser
+from .http_cache import ResponseCache, CachedResponse, CachingResponse
+from .replay import Recorder, RecordingResponse
+from .profiling import PROFILERS, ProfileSettings
+from .upload import (
+    UPLOAD_MODES,
+    PAYLOAD_FORMATS,
+    Uploader,
+    current_uploader,
+    with_uploader,
+)
+from .publish_state import DeltaPublisher
+from .instrumentation import (
+    RunManifest,
+    StageSettings,
+    collect_stages,
+    current_labels,
+    instrumented,
+    stage,
 )
 
 
-def get_tabs_urls(project_id: str):
+def get_tabs_urls(project_id: str, base_url: str = LABELING_BASE_URL):
     if project_id in PROJECT_IDS_2 + PROJECT_IDS_4:
         tabs, urls = zip(
             *[UNCLAIMED, INPROGRESS, REWORK, PENDING_REVIEW, REVIEWED, DELIVERY]
         )
     else:
         tabs, urls = zip(*[REWORK, PENDING_REVIEW, REVIEWED, DELIVERY])
-    final_urls = [x.format(project_id=project_id) for x in urls]
+    final_urls = [x.format(project_id=project_id, base_url=base_url) for x in urls]
     return tabs, final_urls
 
 
-async def http_get(url: str, bearer_token: str):
-    headers = {
-        "Authorization": f"Bearer {bearer_token}",
-        "Content-Type": "application/json",
-    }
-    return await asyncio.to_thread(
-        requests.get, quote(url, safe=":/=?&"), headers=headers
+class LabelingClient:
+    def __init__(
+        self,
+        bearer_token: str,
+        max_concurrency: int = MAX_CONCURRENCY,
+        max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        timeout: float = HTTP_TIMEOUT,
+        snapshot_dir: str = None,
+        full_sync: bool = False,
+        cache: ResponseCache = None,
+        base_url: str = LABELING_BASE_URL,
+        recorder: Recorder = None,
+        executor=None,
+    ):
+        self.snapshot_dir = snapshot_dir
+        self.full_sync = full_sync
+        self.cache = cache
+        self.base_url = base_url
+        self.recorder = recorder
+        self.executor = executor
+        self.headers = {
+            "Authorization": f"Bearer {bearer_token}",
+            "Content-Type": "application/json",
+        }
+        self.max_connections_per_host = max_connections_per_host
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.host_semaphores = {}
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            timeout=httpx.Timeout(timeout, connect=30),
+        )
+
+    def host_semaphore(self, url: str):
+        host = urlsplit(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(
+                self.max_connections_per_host
+            )
+        return self.host_semaphores[host]
+
+    def request_headers(self, url: str):
+        entry = None if self.cache is None else self.cache.lookup(url)
+        if entry is None:
+            return entry, self.headers
+        return entry, {**self.headers, **self.cache.validators(entry)}
+
+    @asynccontextmanager
+    async def stream(self, url: str):
+        async with self.cached_stream(url) as response:
+            writer = None
+            if (self.recorder is not None) and (response.status_code == 200):
+                writer = self.recorder.writer(url)
+            yield response if writer is None else RecordingResponse(response, writer)
+
+    @asynccontextmanager
+    async def cached_stream(self, url: str):
+        entry, headers = self.request_headers(url)
+        if (entry is not None) and self.cache.is_fresh(entry):
+            yield CachedResponse(self.cache, url, entry)
+            return
+        async with self.semaphore, self.host_semaphore(url):
+            async with self.client.stream(
+                "GET", quote(url, safe=":/=?&"), headers=headers
+            ) as response:
+                if self.cache is None:
+                    yield response
+                elif (response.status_code == 304) and (entry is not None):
+                    yield CachedResponse(self.cache, url, self.cache.touch(url, entry))
+                elif response.status_code == 200:
+                    writer = self.cache.writer(url, response.headers)
+                    try:
+                        yield CachingResponse(response, writer)
+                    finally:
+                        writer.close()
+                else:
+                    yield response
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+def add_client_args(parser):
+    parser.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument(
+        "--max-connections-per-host", type=int, default=MAX_CONNECTIONS_PER_HOST
+    )
+    parser.add_argument("--http-timeout", type=float, default=HTTP_TIMEOUT)
+    parser.add_argument("--cache-dir", type=str, default=CACHE_DIR)
+    parser.add_argument(
+        "--base-url",
+        type=str,
+        default=LABELING_BASE_URL,
+        help="labeling API to fetch from, e.g. a local standin_server.py",
+    )
+    parser.add_argument(
+        "--record",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="save every full tab response, with emails scrubbed, for replay",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only fetch conversations updated since the last run; one that has "
+        "left every fetched tab stays in the snapshot until the next full sync",
+    )
+    parser.add_argument(
+        "--full-sync",
+        action="store_true",
+        help="refetch every conversation and rebuild the local snapshot",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=None,
+        help="serve tab responses cached on disk for up to this many seconds, "
+        "revalidating older ones with ETag/Last-Modified",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "number of projects to run at once, tabs are parsed and reports are "
+            "built in a process pool"
+        ),
+    )
+    parser.add_argument(
+        "--upload-mode",
+        choices=UPLOAD_MODES,
+        default="single",
+        help="chunked sends each sheet gzip-compressed in size-bounded chunks "
+        "with retries, the Apps Script side must reassemble them (see README)",
+    )
+    parser.add_argument(
+        "--upload-chunk-bytes",
+        type=int,
+        default=UPLOAD_CHUNK_BYTES,
+        help="uncompressed JSON bytes of rows per chunk",
+    )
+    parser.add_argument("--upload-retries", type=int, default=UPLOAD_RETRIES)
+    parser.add_argument(
+        "--payload-format",
+        choices=PAYLOAD_FORMATS,
+        default="rows",
+        help="columnar sends each sheet as columns, repeated values dictionary "
+        "encoded, the Apps Script side must decode them (see README)",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="only send sheet rows that changed since the last successful upload, "
+        "the Apps Script side must apply upserts and deletes (see README)",
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="with --delta, send every sheet in full and reset the published state",
+    )
+    parser.add_argument(
+        "--full-refresh-hours",
+        type=float,
+        default=PUBLISH_FULL_REFRESH_HOURS,
+        help="with --delta, send a full refresh when the last one is this old",
+    )
+    parser.add_argument(
+        "--manifest-dir",
+        type=str,
+        default=MANIFEST_DIR,
+        help="where each run writes its JSON manifest of stage timings",
+    )
+    parser.add_argument(
+        "--no-manifest",
+        dest="manifest_dir",
+        action="store_const",
+        const=None,
+        help="do not write a run manifest",
+    )
+    parser.add_argument(
+        "--prometheus-textfile",
+        type=str,
+        default=None,
+        help="also write the stage metrics for the node_exporter textfile collector",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        default=bool(os.environ.get("LABELING_TRACE_MEMORY")),
+        help="record tracemalloc peaks per stage (slower), "
+        "also set by LABELING_TRACE_MEMORY=1",
+    )
+    parser.add_argument(
+        "--profile-stage",
+        type=str,
+        action="append",
+        default=[
+            name
+            for name in os.environ.get("LABELING_PROFILE_STAGE", "").split(",")
+            if name
+        ],
+        metavar="STAGE",
+        help="profile a stage by its manifest name, e.g. make_author_share_df or "
+        "fetch/fetch_tab; may be repeated, also set by LABELING_PROFILE_STAGE",
+    )
+    parser.add_argument(
+        "--profiler",
+        choices=PROFILERS,
+        default=os.environ.get("LABELING_PROFILER", "cprofile"),
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=30,
+        help="functions listed in each profile summary",
+    )
+
+
+async def fetch_project(project_id: str, client: LabelingClient, metadata_keys=None):
+    tabs, urls = get_tabs_urls(project_id, client.base_url)
+    return await get_parsed_responses(
+        urls, tabs, project_id, client=client, metadata_keys=metadata_keys
     )
 
 
-async def get_responses(url_list: list[str], bearer_token: str):
+def report_name(build_report):
+    module = build_report.__module__
+    if module != "__main__":
+        return module
+    # a script run directly reports under its file name
+    return os.path.splitext(os.path.basename(sys.modules[module].__file__))[0]
+
+
+async def run_project(
+    project_id: str,
+    fetch,
+    reports,
+    client,
+    executor,
+    settings: StageSettings = None,
+    uploader: Uploader = None,
+):
+    current_labels.set({"project_id": project_id})
+    with stage("fetch", memory=False) as record:
+        try:
+            parsed = await fetch(project_id, client=client)
+            record["rows"] = len(parsed[0])
+        except AssertionError:
+            parsed = None
+            record["error"] = "AssertionError"
+
+    async def build(build_report, appscript_url):
+        build_args = (
+            with_uploader,
+            "build_report",
+            {"project_id": project_id, "report": report_name(build_report)},
+            StageSettings() if settings is None else settings,
+            Uploader() if uploader is None else uploader,
+            build_report,
+            project_id,
+            parsed,
+            appscript_url,
+        )
+        if executor is None:
+            return collect_stages(*build_args)
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, collect_stages, *build_args
+        )
+
     return await asyncio.gather(
-        *[http_get(url, bearer_token=bearer_token) for url in url_list]
+        *(build(build_report, url) for build_report, url in reports),
+        return_exceptions=True,
     )
 
 
+async def run_pipeline(project_reports: dict, fetch, args):
+    semaphore = asyncio.Semaphore(args.jobs)
+    manifest = RunManifest()
+    uploader = Uploader(
+        args.upload_mode,
+        chunk_bytes=args.upload_chunk_bytes,
+        retries=args.upload_retries,
+        delta=(
+            DeltaPublisher(
+                os.path.join(args.cache_dir, "published"),
+                full_refresh=args.full_refresh,
+                max_age=timedelta(hours=args.full_refresh_hours),
+            )
+            if args.delta
+            else None
+        ),
+        sheet_format=args.payload_format,
+    )
+    manifest.settings.trace_memory = args.trace_memory
+    if args.profile_stage:
+        # profiles land next to the manifest and share its name
+        manifest.settings.profile = ProfileSettings(
+            args.profile_stage,
+            os.path.join(args.manifest_dir or MANIFEST_DIR, manifest.name),
+            profiler=args.profiler,
+            top=args.profile_top,
+        )
+
+    with (
+        manifest.activate(),
+        ProcessPoolExecutor(args.jobs) if args.jobs > 1 else nullcontext() as executor,
+    ):
+        async with LabelingClient(
+            args.bearer_token,
+            max_concurrency=args.max_concurrency,
+            max_connections_per_host=args.max_connections_per_host,
+            timeout=args.http_timeout,
+            snapshot_dir=(
+                os.path.join(args.cache_dir, "snapshots") if args.incremental else None
+            ),
+            full_sync=args.full_sync,
+            cache=(
+                ResponseCache(os.path.join(args.cache_dir, "responses"), args.max_age)
+                if args.max_age is not None
+                else None
+            ),
+            base_url=args.base_url,
+            recorder=None if args.record is None else Recorder(args.record),
+            executor=executor,
+        ) as client:
+
+            async def run(project_id: str, reports):
+                async with semaphore:
+                    return await run_project(
+                        project_id,
+                        fetch,
+                        reports,
+                        client,
+                        executor,
+                        manifest.settings,
+                        uploader,
+                    )
+
+            # one failing project or report must not stop the others
+            results = await asyncio.gather(
+                *(run(*item) for item in project_reports.items()),
+                return_exceptions=True,
+            )
+
+    failed = []
+    for (project_id, reports), result in zip(project_reports.items(), results):
+        if isinstance(result, Exception):
+            result = [result] * len(reports)
+        for (build_report, _), outcome in zip(reports, result):
+            if isinstance(outcome, Exception):
+                traceback.print_exception(outcome)
+                failed.append(f"{project_id} ({build_report.__module__})")
+                outcome = getattr(outcome, "stage_records", [])
+            manifest.records.extend(outcome)
+
+    if args.manifest_dir is not None:
+        manifest.write(args.manifest_dir, failed)
+    if args.prometheus_textfile is not None:
+        manifest.write_prometheus(args.prometheus_textfile, failed)
+    if failed:
+        raise RuntimeError(f"Reports failed: {', '.join(failed)}")
+
+
+async def run_projects(project_ids: list[str], fetch, build_report, args):
+    await run_pipeline(
+        {
+            project_id: [(build_report, args.appscript_url)]
+            for project_id in project_ids
+        },
+        fetch,
+        args,
+    )
+
+
+def post_report(appscript_url: str, payload: dict):
+    return current_uploader.get().post(appscript_url, payload)
+
+
 def get_subject_mapping_func(project_id):
     if project_id == "254":
         return lambda x: x.get(
@@ -77,147 +493,451 @@ def get_subject_mapping_func(project_id):
         raise Exception
 
 
+@instrumented
 def make_share_json(df: pd.DataFrame):
-    for col in df.columns:
-        if col.lower().endswith("date"):
-            df[col] = df[col].astype(str)
-    return [df.columns.tolist()] + df.fillna("").astype(str).fillna("").values.tolist()
+    return [df.columns.tolist()] + [
+        list(row)
+        for row in zip(*(share_column(df.iloc[:, i]) for i in range(df.shape[1])))
+    ]
 
 
-def parse_responses(responses, tabs, project_id):
-    task_dict = defaultdict(list)
-    author_dict = defaultdict(list)
-    review_dict = defaultdict(list)
+def share_column(series: pd.Series):
+    # date columns keep "NaT", everything else sends missing values as ""
+    if str(series.name).lower().endswith("date"):
+        return series.astype(str).tolist()
+    if series.dtype.kind in "biuf":
+        # str() of the Python scalars is what astype(str) gives, without the
+        # object copy, NaN is the only float that is not equal to itself
+        return ["" if value != value else str(value) for value in series.tolist()]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if series.hasnans:
+        series = series.fillna("")
+    return series.astype(str).tolist()
+
+
+AUTHOR_COLUMNS = (
+    "TaskID",
+    "ConversationVersionID",
+    "Author",
+    "VersionCreatedDate",
+    "VersionUpdatedDate",
+    "durationMinutes",
+    "form_stage",
+    "VersionNumber",
+)
+REVIEW_COLUMNS = (
+    "TaskID",
+    "ReviewID",
+    "ConversationVersionID",
+    "Reviewer",
+    "SubmittedDate",
+    "durationMinutes",
+    "score",
+    "stage",
+    "num_reviewed_tab",
+    "Reviewed",
+)
 
-    subject_mapping_func = get_subject_mapping_func(project_id)
 
-    q_dim_set = set(QUALITY_DIM_ID_MAPPING.keys())
-
-    for i, list_tasks in enumerate(responses):
-        for task in list_tasks.json():
-            if task["batchId"] in ONBOARDING_BATCH_MAP.get(project_id, []):
-                continue
-            metadata_dict = {
-                i[2 : i.rfind("**")]: i[i.rfind("** - ") + 5 :]
-                for i in task["statement"].split("\n\n")[:-1]
-            }
-            if "id" in metadata_dict:
-                metadata_dict["ID"] = metadata_dict.pop("id")
-            task_dict["TaskID"].append(task["id"])
-            task_dict["Num_Gemini_Correct"].append(
-                metadata_dict.get("rc_form_response_numberOfCorrectLinks", np.nan)
-            )
-            task_dict["Subject"].append(subject_mapping_func(metadata_dict))
-            task_dict["task_status"].append(task["status"])
-            task_dict["Author"].append(
-                task.get("currentUser").get("turingEmail")
-                if task.get("currentUser")
-                else None
-            )
-            for k, v in metadata_dict.items():
-                if k not in task_dict:
-                    task_dict[k].extend(
-                        [
-                            np.nan,
-                        ]
-                        * (len(task_dict["TaskID"]) - 1)
-                    )
-                task_dict[k].append(v)
-            task_dict["tab"].append(tabs[i])
-            if (
-                ("latestDeliveryBatch" in task)
-                and (task["latestDeliveryBatch"])
-                and ("deliveryBatch" in task["latestDeliveryBatch"])
-            ):
-                task_dict["deliveryBatch"].append(
-                    task["latestDeliveryBatch"]["deliveryBatch"]["name"]
-                )
-            else:
-                task_dict["deliveryBatch"].append(np.nan)
-            versions = task["versions"]
-            reviews = [
-                review
-                for review in task["reviews"]
-                if (review["status"] == "published")
-                and (review["reviewer"] is not None)
-            ]
-            for j, version in enumerate(versions):
-                author_dict["TaskID"].append(task["id"])
-                author_dict["ConversationVersionID"].append(version["id"])
-                try:
-                    author = version["author"]["turingEmail"]
-                except:
-                    author = np.nan
-                author_dict["Author"].append(author)
-                author_dict["VersionCreatedDate"].append(version["createdAt"])
-                author_dict["VersionUpdatedDate"].append(version["updatedAt"])
-                author_dict["durationMinutes"].append(version["durationMinutes"])
-                author_dict["form_stage"].append(
+def get_statement_parser(project_id: str, metadata_keys=None):
+    if metadata_keys is None:
+        return make_statement_parser()
+    return make_statement_parser(
+        (
+            *BASE_METADATA_KEYS,
+            *SUBJECT_METADATA_KEYS.get(project_id, ()),
+            *metadata_keys,
+        )
+    )
+
+
+def intern_str(value):
+    # emails, statuses and stages repeat across thousands of rows, the buffers
+    # keep one string object per distinct value
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def parse_task(
+    task,
+    tab,
+    project_id,
+    task_rows,
+    author_rows,
+    review_rows,
+    subject_mapping_func,
+    statement_parser,
+):
+    if task["batchId"] in ONBOARDING_BATCH_MAP.get(project_id, []):
+        return
+    metadata_dict = statement_parser(task["statement"])
+    task_row = {
+        "TaskID": task["id"],
+        "Num_Gemini_Correct": metadata_dict.get(
+            "rc_form_response_numberOfCorrectLinks", np.nan
+        ),
+        "Subject": intern_str(subject_mapping_func(metadata_dict)),
+        "task_status": intern_str(task["status"]),
+        "Author": (
+            intern_str(task.get("currentUser").get("turingEmail"))
+            if task.get("currentUser")
+            else None
+        ),
+    }
+    task_row.update(metadata_dict)
+    if "batchName" in task_row:
+        task_row["batchName"] = intern_str(task_row["batchName"])
+    task_row["tab"] = tab
+    if (
+        ("latestDeliveryBatch" in task)
+        and (task["latestDeliveryBatch"])
+        and ("deliveryBatch" in task["latestDeliveryBatch"])
+    ):
+        task_row["deliveryBatch"] = task["latestDeliveryBatch"]["deliveryBatch"]["name"]
+    else:
+        task_row["deliveryBatch"] = np.nan
+    versions = task["versions"]
+    reviews = [
+        review
+        for review in task["reviews"]
+        if (review["status"] == "published") and (review["reviewer"] is not None)
+    ]
+    for j, version in enumerate(versions):
+        try:
+            author = intern_str(version["author"]["turingEmail"])
+        except:
+            author = np.nan
+        author_rows.append_values(
+            AUTHOR_COLUMNS,
+            (
+                task["id"],
+                version["id"],
+                author,
+                version["createdAt"],
+                version["updatedAt"],
+                version["durationMinutes"],
+                (
                     "stage1 - Question Design"
                     if version.get("formStage") is None
-                    else version["formStage"]
-                )
-                if author_dict["form_stage"][-1] is None:
-                    print(version)
-                # if (j == 0) and (len(versions) > 1):
-                #     author_dict["Rework_task"].append(1)
-                # else:
-                #     author_dict["Rework_task"].append(np.nan)
-                author_dict["VersionNumber"].append(j)
-            review_type = "First_Review"
-            reworked = False
-            num_positive_reviews = 0
+                    else intern_str(version["formStage"])
+                ),
+                j,
+            ),
+        )
+    review_type = "First_Review"
+    reworked = False
+    num_positive_reviews = 0
+    num_reviewed_tab = 0
+    for review in reviews:
+        review_values = (
+            task["id"],
+            review["id"],
+            review["conversationVersionId"],
+            intern_str(review["reviewer"]["turingEmail"]),
+            review["submittedAt"],
+            review["durationMinutes"],
+            review["score"],
+            review_type,
+            num_reviewed_tab,
+        )
+        q_scores = {
+            q_dim["qualityDimensionId"]: q_dim["score"]
+            for q_dim in review["qualityDimensionValues"]
+        }
+        if review["followupRequired"]:
+            reviewed = "No"
+            reworked = True
             num_reviewed_tab = 0
-            for review in reviews:
-                review_dict["TaskID"].append(task["id"])
-                review_dict["ReviewID"].append(review["id"])
-                review_dict["ConversationVersionID"].append(
-                    review["conversationVersionId"]
-                )
-                review_dict["Reviewer"].append(review["reviewer"]["turingEmail"])
-                review_dict["SubmittedDate"].append(review["submittedAt"])
-                review_dict["durationMinutes"].append(review["durationMinutes"])
-                review_dict["score"].append(review["score"])
-                review_dict["stage"].append(review_type)
-                review_dict["num_reviewed_tab"].append(num_reviewed_tab)
-                q_added = set()
-                for q_dim in review["qualityDimensionValues"]:
-                    q_added.add(q_dim["qualityDimensionId"])
-                    review_dict[
-                        QUALITY_DIM_ID_MAPPING[q_dim["qualityDimensionId"]]
-                    ].append(q_dim["score"])
-                for extra_col in q_dim_set - q_added:
-                    review_dict[QUALITY_DIM_ID_MAPPING[extra_col]].append(None)
-                if review["followupRequired"]:
-                    review_dict["Reviewed"].append("No")
-                    reworked = True
-                    num_reviewed_tab = 0
-                else:
-                    review_dict["Reviewed"].append("Yes")
-                    review_type = "Second_Review"
-                    reworked = False
-                    num_positive_reviews += 1
-                    num_reviewed_tab = 1
-            task_dict["reworked"].append(reworked)
-            task_dict["num_positive_reviews"].append(num_positive_reviews)
-            form_stage = None
-            for status in task["statusHistory"]:
-                form_stage = (
-                    status["formStage"] if status.get("formStage") else form_stage
+        else:
+            reviewed = "Yes"
+            review_type = "Second_Review"
+            reworked = False
+            num_positive_reviews += 1
+            num_reviewed_tab = 1
+        review_rows.append_scored(REVIEW_COLUMNS, (*review_values, reviewed), q_scores)
+    task_row["reworked"] = reworked
+    task_row["num_positive_reviews"] = num_positive_reviews
+    form_stage = None
+    for status in task["statusHistory"]:
+        form_stage = status["formStage"] if status.get("formStage") else form_stage
+    task_row["formStage"] = form_stage
+    task_rows.append(task_row)
+
+
+def parse_tab(
+    tasks,
+    tab,
+    project_id,
+    task_rows=None,
+    author_rows=None,
+    review_rows=None,
+    metadata_keys=None,
+):
+    task_rows = ColumnarRows() if task_rows is None else task_rows
+    author_rows = ColumnarRows() if author_rows is None else author_rows
+    review_rows = ScoredRows() if review_rows is None else review_rows
+
+    subject_mapping_func = get_subject_mapping_func(project_id)
+    statement_parser = get_statement_parser(project_id, metadata_keys)
+
+    for task in tasks:
+        parse_task(
+            task,
+            tab,
+            project_id,
+            task_rows,
+            author_rows,
+            review_rows,
+            subject_mapping_func,
+            statement_parser,
+        )
+
+    return task_rows, author_rows, review_rows
+
+
+def parse_responses(responses, tabs, project_id, metadata_keys=None):
+    task_rows = ColumnarRows()
+    author_rows = ColumnarRows()
+    review_rows = ScoredRows()
+
+    for tab, list_tasks in zip(tabs, responses):
+        parse_tab(
+            list_tasks.json(),
+            tab,
+            project_id,
+            task_rows,
+            author_rows,
+            review_rows,
+            metadata_keys,
+        )
+
+    return task_rows, author_rows, review_rows
+
+
+def concat_parsed(parsed_tabs):
+    return tuple(
+        rows_type.concat([parsed[i] for parsed in parsed_tabs])
+        for i, rows_type in enumerate((ColumnarRows, ColumnarRows, ScoredRows))
+    )
+
+
+def rows_to_frame(rows):
+    if isinstance(rows, ColumnarRows):
+        return rows.to_frame()
+    return pd.DataFrame(rows)
+
+
+class ResponseReader:
+    def __init__(self, response, stats: dict = None):
+        self.chunks = response.aiter_bytes()
+        self.stats = {} if stats is None else stats
+        self.stats["bytes"] = 0
+
+    async def read(self, size=-1):
+        # ijson probes the reader with read(0) before streaming
+        if size == 0:
+            return b""
+        chunk = await anext(self.chunks, b"")
+        self.stats["bytes"] += len(chunk)
+        return chunk
+
+
+def add_updated_since_filter(url: str, updated_since: str):
+    return f"{url}&filter[{url.count('filter[')}]=updatedAt||$gte||{updated_since}"
+
+
+async def stream_conversations(url: str, client: LabelingClient, stats: dict = None):
+    async with client.stream(url) as response:
+        assert response.status_code == 200, "Wrong Status Code"
+        async for task in ijson.items_async(
+            ResponseReader(response, stats), "item", use_float=True
+        ):
+            yield task
+
+
+async def read_conversations(url: str, client: LabelingClient, stats: dict = None):
+    async with client.stream(url) as response:
+        assert response.status_code == 200, "Wrong Status Code"
+        reader = ResponseReader(response, stats)
+        chunks = []
+        while chunk := await reader.read():
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def parse_body(body: bytes, tab, project_id: str, metadata_keys=None):
+    return parse_tab(
+        ijson.items(body, "item", use_float=True),
+        tab,
+        project_id,
+        metadata_keys=metadata_keys,
+    )
+
+
+async def stream_tab(
+    url: str, tab, project_id: str, client: LabelingClient, metadata_keys=None
+):
+    if client.executor is not None:
+        # the pool gets the whole body, the event loop only downloads
+        with stage("fetch_tab", memory=False, tab=tab) as record:
+            body = await read_conversations(url, client=client, stats=record)
+            parsed = await asyncio.get_running_loop().run_in_executor(
+                client.executor, parse_body, body, tab, project_id, metadata_keys
+            )
+            record["rows"] = len(parsed[0])
+        return parsed
+
+    task_rows = ColumnarRows()
+    author_rows = ColumnarRows()
+    review_rows = ScoredRows()
+
+    subject_mapping_func = get_subject_mapping_func(project_id)
+    statement_parser = get_statement_parser(project_id, metadata_keys)
+
+    # tabs stream concurrently, so their tracemalloc peaks would overlap
+    with stage("fetch_tab", memory=False, tab=tab) as record:
+        async for task in stream_conversations(url, client=client, stats=record):
+            parse_task(
+                task,
+                tab,
+                project_id,
+                task_rows,
+                author_rows,
+                review_rows,
+                subject_mapping_func,
+                statement_parser,
+            )
+        record["rows"] = len(task_rows)
+
+    return task_rows, author_rows, review_rows
+
+
+async def sync_tab(url: str, tab, client: LabelingClient, store: SnapshotStore):
+    high_water_mark = None
+    with stage("sync_tab", memory=False, tab=tab, rows=0) as record:
+        async for task in stream_conversations(url, client=client, stats=record):
+            store.upsert(tab, task)
+            record["rows"] += 1
+            if task.get("updatedAt") and (
+                (high_water_mark is None)
+                or (
+                    datetime.fromisoformat(task["updatedAt"])
+                    > datetime.fromisoformat(high_water_mark)
                 )
-            task_dict["formStage"].append(form_stage)
-            for k, v in task_dict.items():
-                if len(v) < len(task_dict["TaskID"]):
-                    task_dict[k].append(np.nan)
+            ):
+                high_water_mark = task["updatedAt"]
+    return high_water_mark
+
+
+async def gather_or_cancel(coroutines):
+    tasks = [asyncio.create_task(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def parse_snapshot(path: str, tabs, project_id: str, metadata_keys=None):
+    task_rows = ColumnarRows()
+    author_rows = ColumnarRows()
+    review_rows = ScoredRows()
+    store = SnapshotStore(path)
+    try:
+        for tab in tabs:
+            parse_tab(
+                store.conversations(tab),
+                tab,
+                project_id,
+                task_rows,
+                author_rows,
+                review_rows,
+                metadata_keys,
+            )
+    finally:
+        store.close()
+    return task_rows, author_rows, review_rows
+
+
+async def get_synced_responses(
+    urls: list[str], tabs, project_id: str, client: LabelingClient, metadata_keys=None
+):
+    path = os.path.join(client.snapshot_dir, f"{project_id}.sqlite")
+    store = SnapshotStore(path)
+    try:
+        updated_since = None if client.full_sync else store.updated_since()
+        if updated_since is None:
+            store.clear()
+        else:
+            urls = [add_updated_since_filter(url, updated_since) for url in urls]
+
+        try:
+            high_water_marks = await gather_or_cancel(
+                sync_tab(url, tab, client=client, store=store)
+                for url, tab in zip(urls, tabs)
+            )
+        except BaseException:
+            store.rollback()
+            raise
+        store.drop_moved(tabs)
+        store.commit(
+            max(
+                filter(None, high_water_marks),
+                key=datetime.fromisoformat,
+                default=None,
+            ),
+            full_sync=updated_since is None,
+        )
+    finally:
+        store.close()
+
+    with stage("parse_snapshot", memory=False) as record:
+        parse_args = (path, tabs, project_id, metadata_keys)
+        if client.executor is None:
+            parsed = parse_snapshot(*parse_args)
+        else:
+            parsed = await asyncio.get_running_loop().run_in_executor(
+                client.executor, parse_snapshot, *parse_args
+            )
+        record["rows"] = len(parsed[0])
+    return parsed
 
-    return task_dict, author_dict, review_dict
+
+async def get_parsed_responses(
+    urls: list[str], tabs, project_id: str, client: LabelingClient, metadata_keys=None
+):
+    if client.snapshot_dir is not None:
+        return await get_synced_responses(
+            urls, tabs, project_id, client=client, metadata_keys=metadata_keys
+        )
+
+    parsed_tabs = await gather_or_cancel(
+        stream_tab(url, tab, project_id, client=client, metadata_keys=metadata_keys)
+        for url, tab in zip(urls, tabs)
+    )
+    return concat_parsed(parsed_tabs)
+
+
+def get_score_columns(df: pd.DataFrame):
+    return ["score"] + [
+        dim for dim in QUALITY_DIM_ID_MAPPING.values() if dim in df.columns
+    ]
+
+
+def mean_scores(df: pd.DataFrame, by: list[str]):
+    # dimension scores are stored as float32, average them in float64
+    return (
+        df[get_score_columns(df)]
+        .astype(np.float64)
+        .groupby([df[col] for col in by], observed=True)
+        .mean()
+        .reset_index()
+    )
 
 
 def author_metric_group(input_df):
     new_samples = input_df[input_df["Rework_or_NewTask"] == "New_Task"]
-    score_cols = ["score"] + [
-        dim for dim in QUALITY_DIM_ID_MAPPING.values() if dim in input_df.columns
-    ]
+    score_cols = get_score_columns(input_df)
     score_dict = {i: input_df[i].mean() for i in score_cols}
 
     return pd.Series(
@@ -244,37 +964,11 @@ def author_metric_group(input_df):
     )
 
 
-def make_author_metrics_share_df(author_df, review_df):
-    grouped_review = group_review(review_df)
-
-    rework_dict = (
-        review_df[review_df["Reviewed"] == "No"].groupby("TaskID").size().to_dict()
-    )
-
-    author_df["Num_rework_total"] = author_df.apply(
-        lambda x: (
-            rework_dict.get(x["TaskID"], 0)
-            if x["Rework_or_NewTask"] == "New_Task"
-            else np.nan
-        ),
-        axis=1,
-    )
-    author_df["Rework_task"] = author_df.apply(
-        lambda x: (
-            1
-            if (x["TaskID"] in rework_dict) and (x["Rework_or_NewTask"] == "New_Task")
-            else np.nan
-        ),
-        axis=1,
-    )
-
-    author_metrics_share = (
-        author_df.merge(
-            grouped_review, on=["TaskID", "ConversationVersionID"], how="left"
-        )
-        .groupby(["Author", "VersionUpdatedDate"], as_index=False)
-        .apply(author_metric_group, include_groups=False)
-    )
+@instrumented
+def make_author_metrics_share_df(context: "ReportContext"):
+    author_metrics_share = context.author_review_df.groupby(
+        ["Author", "VersionUpdatedDate"], as_index=False, observed=True
+    ).apply(author_metric_group, include_groups=False)
 
     author_metrics_share["Rework_percent"] = (
         author_metrics_share["Num_Reworks"] / author_metrics_share["Num_Reviewed"]
@@ -293,46 +987,34 @@ def make_author_metrics_share_df(author_df, review_df):
     return author_metrics_share
 
 
-def make_reviewer_agg(input_df) -> pd.DataFrame:
-    first_df = (
-        input_df.groupby(["Reviewer", "SubmittedDate", "Reviewed"])["TaskID"]
-        .size()
-        .reset_index()
-    )
-    first_df = (
-        first_df.pivot(
-            columns="Reviewed", index=["Reviewer", "SubmittedDate"], values="TaskID"
-        )
-        .reset_index()
-        .rename(columns={"No": "Num_Reworks", "Yes": "Num_Done"})
-    )
+REVIEWER_AGG_COLUMNS = {
+    ("size", "No"): "Num_Reworks",
+    ("size", "Yes"): "Num_Done",
+    ("mean", "No"): "Rework_duration_min",
+    ("mean", "Yes"): "Done_duration_min",
+}
 
-    second_df = (
-        input_df.groupby(["Reviewer", "SubmittedDate", "Reviewed"])["durationMinutes"]
-        .mean()
-        .reset_index()
-    )
-    second_df = (
-        second_df.pivot(
-            columns="Reviewed",
-            index=["Reviewer", "SubmittedDate"],
-            values="durationMinutes",
-        )
-        .reset_index()
-        .rename(columns={"No": "Rework_duration_min", "Yes": "Done_duration_min"})
-    )
 
-    return first_df.merge(
-        second_df, on=["Reviewer", "SubmittedDate"], validate="one_to_one"
+@instrumented
+def make_reviewer_agg(input_df) -> pd.DataFrame:
+    reviewer_agg = (
+        input_df.groupby(["Reviewer", "SubmittedDate", "Reviewed"], observed=True)[
+            "durationMinutes"
+        ]
+        .agg(["size", "mean"])
+        .unstack("Reviewed")
     )
+    reviewer_agg.columns = [REVIEWER_AGG_COLUMNS[col] for col in reviewer_agg.columns]
+    return reviewer_agg.reset_index()
 
 
+@instrumented
 def make_second_reviewer_share(review_df):
     second_df = review_df[review_df["stage"] == "Second_Review"]
     second_review_df = make_reviewer_agg(second_df)
     extra_info = (
         second_df[["Reviewer", "SubmittedDate", "num_reviewed_tab"]]
-        .groupby(["Reviewer", "SubmittedDate"])["num_reviewed_tab"]
+        .groupby(["Reviewer", "SubmittedDate"], observed=True)["num_reviewed_tab"]
         .sum()
         .reset_index()
     )
@@ -342,6 +1024,7 @@ def make_second_reviewer_share(review_df):
     return second_review_df
 
 
+@instrumented
 def make_reviewer_share_df(review_df: pd.DataFrame) -> pd.DataFrame:
     first_review_df = review_df[review_df["stage"] == "First_Review"]
     second_review_df = review_df[review_df["stage"] == "Second_Review"]
@@ -357,27 +1040,21 @@ def make_reviewer_share_df(review_df: pd.DataFrame) -> pd.DataFrame:
     )
 
     third_df = (
-        second_first_review.groupby(["Reviewer", "SubmittedDate"])["TaskID"]
+        second_first_review.groupby(["Reviewer", "SubmittedDate"], observed=True)[
+            "TaskID"
+        ]
         .nunique()
         .reset_index()
         .rename(columns={"TaskID": "Num_Second_Reviewed"})
     )
     fourth_df = (
         second_first_review[second_first_review["Reviewed"] == "No"]
-        .groupby(["Reviewer", "SubmittedDate"])["TaskID"]
+        .groupby(["Reviewer", "SubmittedDate"], observed=True)["TaskID"]
         .nunique()
         .reset_index()
         .rename(columns={"TaskID": "Num_Second_Rework"})
     )
-    score_cols = ["score"] + [
-        dim for dim in QUALITY_DIM_ID_MAPPING.values() if dim in review_df.columns
-    ]
-
-    fifth_df = (
-        second_first_review.groupby(["Reviewer", "SubmittedDate"])[score_cols]
-        .mean()
-        .reset_index()
-    )
+    fifth_df = mean_scores(second_first_review, ["Reviewer", "SubmittedDate"])
 
     three_four_five = (
         third_df.merge(
@@ -409,47 +1086,74 @@ def make_reviewer_share_df(review_df: pd.DataFrame) -> pd.DataFrame:
     return all_joined
 
 
-def assign_status(row):
-    if row["tab"] == "unclaimed":
-        return "Unclaimed"
-    elif row["tab"] == "inprogress":
-        return "Inprogress"
-    elif (
-        (row["tab"] == "pending_review")
-        and (row["num_positive_reviews"] == 0)
-        and (not row["reworked"])
-    ):
-        return "Ready For Review"
-    elif (row["tab"] == "rework") and (row["num_positive_reviews"] == 0):
-        return "1st Review Comments Added"
-    elif (
-        (row["tab"] == "pending_review")
-        and (row["num_positive_reviews"] == 0)
-        and (row["reworked"])
-    ):
-        return "1st Review Comments Addressed"
-    elif (row["tab"] in ["reviewed", "delivery"]) and (row["num_positive_reviews"] < 2):
-        return "1st Review Done"
-    elif (row["tab"] == "rework") and (row["num_positive_reviews"] > 0):
-        return "2nd Review Comments Added"
-    elif (
-        (row["tab"] == "pending_review")
-        and (row["num_positive_reviews"] > 0)
-        and (row["reworked"])
-    ):
-        return "2nd Review Comments Addressed"
-    elif (row["tab"] in ["reviewed", "delivery"]) and (row["num_positive_reviews"] > 1):
-        return "2nd Review Done"
-    elif row["tab"] == "delivery":
-        return "Delivered"
-    return "Invalid Status"
+RULE_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def rule_mask(df: pd.DataFrame, conditions: dict):
+    mask = np.ones(len(df), dtype=bool)
+    for column, condition in conditions.items():
+        if isinstance(condition, list):
+            mask &= df[column].isin(condition).to_numpy()
+        elif isinstance(condition, tuple):
+            op, value = condition
+            mask &= RULE_OPERATORS[op](df[column], value).to_numpy(dtype=bool)
+        else:
+            mask &= (df[column] == condition).to_numpy(dtype=bool)
+    return mask
+
+
+def evaluate_rules(df: pd.DataFrame, rules, default=INVALID_STATUS):
+    labels = [label for label, _ in rules]
+    if isinstance(default, pd.Series):
+        default_values = default.to_numpy(dtype=object)
+        categories = labels + [x for x in pd.unique(default_values) if x not in labels]
+    else:
+        default_values = default
+        categories = labels + [default]
+    values = np.select(
+        [rule_mask(df, conditions) for _, conditions in rules],
+        np.array(labels, dtype=object),
+        default=default_values,
+    )
+    # sorted categories keep crosstab/pivot column order alphabetical
+    return pd.Series(
+        pd.Categorical(values, categories=sorted(set(categories), key=str)),
+        index=df.index,
+    )
+
+
+def categorize(df: pd.DataFrame, columns=CATEGORY_COLUMNS):
+    # categories come out sorted, so sorting, grouping and pivoting on the codes
+    # gives the same order as on the strings
+    for col in columns:
+        if (col in df.columns) and (df[col].dtype == object):
+            df[col] = df[col].astype("category")
+    return df
+
 
+def observed_counts(series: pd.Series):
+    # value_counts of a categorical lists every category, most with a 0 count
+    counts = series.value_counts()
+    return counts[counts > 0]
 
-def prepare_task_df(task_dict):
-    task_df = pd.DataFrame(task_dict)
+
+def get_status_rules(project_id: str = None):
+    return PROJECT_STATUS_RULES.get(project_id, []) + STATUS_RULES
+
+
+@instrumented
+def prepare_task_df(task_dict, project_id: str = None):
+    task_df = categorize(rows_to_frame(task_dict))
     task_df["Num_Gemini_Correct"] = pd.to_numeric(task_df["Num_Gemini_Correct"])
     task_df["batchId"] = pd.to_numeric(task_df["batchId"])
-    task_df["Status"] = task_df.apply(assign_status, axis=1)
+    task_df["Status"] = evaluate_rules(task_df, get_status_rules(project_id))
 
     if task_df["Num_Gemini_Correct"].sum() > 0:
         zero_one_task_df = task_df[task_df["Num_Gemini_Correct"] < 2].reset_index(
@@ -460,21 +1164,21 @@ def prepare_task_df(task_dict):
         return task_df
 
 
+@instrumented
 def make_review_df(review_dict, tasks, convert_to_date=True):
-    review_df = pd.DataFrame(review_dict)
+    review_df = categorize(rows_to_frame(review_dict))
     review_df["SubmittedDate"] = pd.to_datetime(review_df["SubmittedDate"])
     if convert_to_date:
         review_df["SubmittedDate"] = review_df["SubmittedDate"].dt.date
 
-    review_df["Has_0_or_1_Correctness"] = review_df["TaskID"].apply(
-        lambda x: int(x in set(tasks))
-    )
+    review_df["Has_0_or_1_Correctness"] = review_df["TaskID"].isin(tasks).astype(int)
     return review_df
 
 
+@instrumented
 def make_author_df(author_dict, tasks, convert_to_date=True):
 
-    author_df = pd.DataFrame(author_dict)
+    author_df = rows_to_frame(author_dict)
     author_df["VersionCreatedDate"] = pd.to_datetime(author_df["VersionCreatedDate"])
     author_df["VersionUpdatedDate"] = pd.to_datetime(author_df["VersionUpdatedDate"])
 
@@ -482,71 +1186,88 @@ def make_author_df(author_dict, tasks, convert_to_date=True):
         author_df["VersionCreatedDate"] = author_df["VersionCreatedDate"].dt.date
         author_df["VersionUpdatedDate"] = author_df["VersionUpdatedDate"].dt.date
 
-    author_df["Has_0_or_1_Correctness"] = author_df.apply(
-        lambda x: int(x["TaskID"] in set(tasks)) if x["VersionNumber"] == 0 else np.nan,
-        axis=1,
+    author_df["Has_0_or_1_Correctness"] = np.where(
+        author_df["VersionNumber"] == 0, author_df["TaskID"].isin(tasks), np.nan
     )
 
     author_df["Rework_or_NewTask"] = author_df["VersionNumber"].apply(
         lambda x: "Rework" if x > 0 else "New_Task"
     )
-    return author_df
+    return categorize(author_df)
 
 
 def group_review(review_df):
-    score_cols = ["score"] + [
-        dim for dim in QUALITY_DIM_ID_MAPPING.values() if dim in review_df.columns
-    ]
-    return review_df.groupby(["TaskID", "ConversationVersionID"], as_index=False)[
-        score_cols
-    ].mean()
-
+    return mean_scores(review_df, ["TaskID", "ConversationVersionID"])
+
+
+# Intermediates shared by the author report builders of one project run
+class ReportContext:
+    def __init__(self, author_df: pd.DataFrame, review_df: pd.DataFrame):
+        self.base_author_df = author_df
+        self.review_df = review_df
+
+    @cached_property
+    def grouped_review(self):
+        return group_review(self.review_df)
+
+    @cached_property
+    def rework_dict(self):
+        return (
+            self.review_df[self.review_df["Reviewed"] == "No"]
+            .groupby("TaskID")
+            .size()
+            .to_dict()
+        )
 
-def make_author_share_df(author_df: pd.DataFrame, review_df: pd.DataFrame):
-    grouped_review = group_review(review_df)
+    @cached_property
+    def author_df(self):
+        author_df = self.base_author_df.copy()
+        keys = ["TaskID", "ConversationVersionID"]
+        reviewed = pd.MultiIndex.from_frame(author_df[keys]).isin(
+            pd.MultiIndex.from_frame(self.review_df[keys].dropna())
+        )
+        self_reviewed = pd.MultiIndex.from_arrays(
+            [author_df[key] for key in keys] + [author_df["Author"].astype(object)]
+        ).isin(
+            pd.MultiIndex.from_arrays(
+                [self.review_df[key] for key in keys]
+                + [self.review_df["Reviewer"].astype(object)]
+            )
+        )
+        # 1 when the author also reviewed the version, NaN when nobody reviewed it
+        reviewer_changes = pd.Series(self_reviewed.astype(int), index=author_df.index)
+        author_df["Reviewer_changes"] = (
+            reviewer_changes if reviewed.all() else reviewer_changes.where(reviewed)
+        )
 
-    rework_dict = (
-        review_df[review_df["Reviewed"] == "No"].groupby("TaskID").size().to_dict()
-    )
+        new_task = (author_df["Rework_or_NewTask"] == "New_Task").to_numpy()
+        author_df["Num_rework_total"] = np.where(
+            new_task,
+            author_df["TaskID"].map(self.rework_dict).fillna(0),
+            np.nan,
+        )
+        author_df["Rework_task"] = np.where(
+            new_task & author_df["TaskID"].isin(self.rework_dict).to_numpy(),
+            1,
+            np.nan,
+        )
+        return author_df
 
-    reviewer_grouped = review_df.groupby(
-        ["TaskID", "ConversationVersionID"], as_index=False
-    )[["Reviewer"]].agg(set)
+    @cached_property
+    def author_review_df(self):
+        return self.author_df.merge(
+            self.grouped_review, on=["TaskID", "ConversationVersionID"], how="left"
+        )
 
-    author_df["Reviewer_changes"] = author_df.merge(
-        reviewer_grouped, on=["TaskID", "ConversationVersionID"], how="left"
-    ).apply(
-        lambda x: (
-            int(x["Author"] in x["Reviewer"])
-            if isinstance(x["Reviewer"], set)
-            else np.nan
-        ),
-        axis=1,
-    )
 
-    author_df["Num_rework_total"] = author_df.apply(
-        lambda x: (
-            rework_dict.get(x["TaskID"], 0)
-            if x["Rework_or_NewTask"] == "New_Task"
-            else np.nan
-        ),
-        axis=1,
-    )
-    author_df["Rework_task"] = author_df.apply(
-        lambda x: (
-            1
-            if (x["TaskID"] in rework_dict) and (x["Rework_or_NewTask"] == "New_Task")
-            else np.nan
-        ),
-        axis=1,
+@instrumented
+def make_author_share_df(context: ReportContext):
+    author_summary_group = context.author_review_df.groupby(
+        ["Author", "VersionUpdatedDate", "Rework_or_NewTask"],
+        as_index=False,
+        observed=True,
     )
-
-    author_summary_group = author_df.merge(
-        grouped_review, on=["TaskID", "ConversationVersionID"], how="left"
-    ).groupby(["Author", "VersionUpdatedDate", "Rework_or_NewTask"], as_index=False)
-    score_cols = ["score"] + [
-        dim for dim in QUALITY_DIM_ID_MAPPING.values() if dim in review_df.columns
-    ]
+    score_cols = get_score_columns(context.review_df)
 
     first_set_cols = author_summary_group.agg(
         Num_samples=("TaskID", "size"),
@@ -602,9 +1323,13 @@ def make_author_share_df(author_df: pd.DataFrame, review_df: pd.DataFrame):
     return author_summary_share
 
 
-def make_overall_stats(author_df, review_df):
+@instrumented
+def make_overall_stats(context: ReportContext):
+    author_df = context.author_df
+    review_df = context.review_df
     first_review_df = review_df[review_df["stage"] == "First_Review"]
     second_review_df = review_df[review_df["stage"] == "Second_Review"]
+    active_author_df = author_df[author_df["Reviewer_changes"] != 1]
 
     author_overall = (
         author_df[author_df["Rework_or_NewTask"] == "New_Task"]
@@ -614,11 +1339,8 @@ def make_overall_stats(author_df, review_df):
             Num_0_or_1_Correctness_made=("Has_0_or_1_Correctness", "sum"),
         )
         .merge(
-            author_df[author_df["Reviewer_changes"] != 1]
-            .groupby("VersionUpdatedDate", as_index=False)
-            .agg(
+            active_author_df.groupby("VersionUpdatedDate", as_index=False).agg(
                 Num_Active_Authors=("Author", "nunique"),
-                Author_list=("Author", "unique"),
             ),
             how="outer",
             on="VersionUpdatedDate",
@@ -636,7 +1358,6 @@ def make_overall_stats(author_df, review_df):
         .merge(
             first_review_df.groupby("SubmittedDate", as_index=False).agg(
                 Num_Active_First_Reviewers=("Reviewer", "nunique"),
-                First_Reviewer_list=("Reviewer", "unique"),
             ),
             how="outer",
         )
@@ -652,7 +1373,6 @@ def make_overall_stats(author_df, review_df):
         .merge(
             second_review_df.groupby("SubmittedDate", as_index=False).agg(
                 Num_Active_Second_Reviewers=("Reviewer", "nunique"),
-                Second_Reviewer_list=("Reviewer", "unique"),
             ),
             how="outer",
         )
@@ -662,30 +1382,32 @@ def make_overall_stats(author_df, review_df):
     overall_stats_share = author_overall.merge(
         first_reviewer_overall, how="outer", on="Date", validate="one_to_one"
     ).merge(second_reviewer_overall, how="outer", on="Date", validate="one_to_one")
-    overall_stats_share["Num_Active_Headcount"] = overall_stats_share.apply(
-        lambda x: len(
-            set(
-                (
-                    list(x["Author_list"])
-                    if hasattr(x["Author_list"], "__iter__")
-                    else []
-                )
-                + (
-                    list(x["First_Reviewer_list"])
-                    if hasattr(x["First_Reviewer_list"], "__iter__")
-                    else []
-                )
-                + (
-                    list(x["Second_Reviewer_list"])
-                    if hasattr(x["Second_Reviewer_list"], "__iter__")
-                    else []
-                )
-            )
-        ),
-        axis=1,
+    active_people = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "Date": active_author_df["VersionUpdatedDate"].to_numpy(),
+                    "Person": active_author_df["Author"].to_numpy(),
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "Date": first_review_df["SubmittedDate"].to_numpy(),
+                    "Person": first_review_df["Reviewer"].to_numpy(),
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "Date": second_review_df["SubmittedDate"].to_numpy(),
+                    "Person": second_review_df["Reviewer"].to_numpy(),
+                }
+            ),
+        ],
+        ignore_index=True,
     )
-    overall_stats_share = overall_stats_share.drop(
-        columns=["Author_list", "First_Reviewer_list", "Second_Reviewer_list"]
+    headcount = active_people.dropna().drop_duplicates().groupby("Date").size()
+    overall_stats_share["Num_Active_Headcount"] = (
+        overall_stats_share["Date"].map(headcount).fillna(0).astype(int)
     )
     return overall_stats_share
 
@@ -699,6 +1421,7 @@ def prepare_audit_report(review_df: pd.DataFrame, task_df: pd.DataFrame):
     )
 
 
+@instrumented
 def fix_discardability(review_df: pd.DataFrame):
     review_df = review_df.copy(deep=True)
     if "Question Discardability" in review_df.columns:
@@ -720,6 +1443,7 @@ def fix_discardability(review_df: pd.DataFrame):
                 & (review_df["Question Discardability"] == 5),
                 score_cols,
             ]
+            .astype(np.float64)
             .replace({0: np.nan})
             .mean(axis=1)
             .fillna(